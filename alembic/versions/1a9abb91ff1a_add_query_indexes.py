@@ -0,0 +1,51 @@
+"""add query indexes
+
+Revision ID: 1a9abb91ff1a
+Revises: 1f0699d3b40d
+Create Date: 2026-01-19 15:27:12.406311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1a9abb91ff1a'
+down_revision: Union[str, None] = '1f0699d3b40d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя, таблица, колонки) - под фильтры и сортировки роутеров
+INDEXES = [
+    # /analytics/clients/{id}/orders_sql: WHERE client_id ORDER BY id DESC; FK
+    ('ix_orders_client_id_id', 'orders', ['client_id', 'id']),
+    ('ix_orders_created_at', 'orders', ['created_at']),
+    # FK order_items -> dishes (удаление блюда, выборки по блюду)
+    ('ix_order_items_dish_id', 'order_items', ['dish_id']),
+    # list_dishes / filter_sql / raise_price_sql: category =, calories >=
+    ('ix_dishes_category_calories', 'dishes', ['category', 'calories']),
+    # сортировки list_dishes / filter_sql + keyset (sort_col, id)
+    ('ix_dishes_price_id', 'dishes', ['price', 'id']),
+    ('ix_dishes_calories_id', 'dishes', ['calories', 'id']),
+    ('ix_dishes_name_id', 'dishes', ['name', 'id']),
+    # list_clients: organization =, age >=, сортировки + keyset
+    ('ix_clients_organization_id', 'clients', ['organization', 'id']),
+    ('ix_clients_age_id', 'clients', ['age', 'id']),
+    ('ix_clients_full_name_id', 'clients', ['full_name', 'id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY нельзя внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,50 @@
+"""add unit_price and order total
+
+Revision ID: 1f0699d3b40d
+Revises: 92f9a72bd23c
+Create Date: 2026-01-16 09:41:05.772913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f0699d3b40d'
+down_revision: Union[str, None] = '92f9a72bd23c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('order_items', sa.Column('unit_price', sa.Float(), nullable=True))
+    op.add_column('orders', sa.Column('total', sa.Float(), nullable=True))
+
+    # backfill: для истории берём текущие цены блюд
+    op.execute("""
+        UPDATE order_items oi
+        SET unit_price = d.price
+        FROM dishes d
+        WHERE d.id = oi.dish_id
+    """)
+    op.execute("""
+        UPDATE orders o
+        SET total = COALESCE(s.total, 0)
+        FROM (
+          SELECT o2.id, SUM(oi.unit_price * oi.quantity) AS total
+          FROM orders o2
+          LEFT JOIN order_items oi ON oi.order_id = o2.id
+          GROUP BY o2.id
+        ) s
+        WHERE s.id = o.id
+    """)
+
+    op.alter_column('order_items', 'unit_price', nullable=False)
+    op.alter_column('orders', 'total', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('orders', 'total')
+    op.drop_column('order_items', 'unit_price')
@@ -0,0 +1,42 @@
+"""add trigram search indexes
+
+Revision ID: 2c7b5d9e4f11
+Revises: 8e4d1f6a2c93
+Create Date: 2026-02-16 10:21:54.830417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7b5d9e4f11'
+down_revision: Union[str, None] = '8e4d1f6a2c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# q= в list_dishes / list_clients (app/search.py): ILIKE и %> по GIN gin_trgm_ops
+INDEXES = [
+    ('ix_dishes_name_trgm', 'dishes', 'name'),
+    ('ix_clients_full_name_trgm', 'clients', 'full_name'),
+]
+
+
+def upgrade() -> None:
+    # pg_trgm - trusted-расширение (PG 13+): хватает права CREATE на базу
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name, table, [column],
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    # расширение не удаляем: им могут пользоваться и вне этих индексов
@@ -0,0 +1,48 @@
+"""add daily_revenue
+
+Revision ID: 3c9a5e7f21b6
+Revises: b7e2f90c4d18
+Create Date: 2026-02-02 14:05:31.118940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a5e7f21b6'
+down_revision: Union[str, None] = 'b7e2f90c4d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_revenue',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('payment_type', sa.String(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'category', 'payment_type')
+    )
+
+    # backfill
+    op.execute("""
+        INSERT INTO daily_revenue (day, category, payment_type, revenue, quantity)
+        SELECT
+          CAST(o.created_at AS date),
+          COALESCE(d.category, ''),
+          COALESCE(o.payment_type, ''),
+          SUM(oi.unit_price * oi.quantity),
+          SUM(oi.quantity)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id AND oi.created_at = o.created_at
+        JOIN dishes d ON d.id = oi.dish_id
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_revenue')
@@ -0,0 +1,32 @@
+"""add table_versions
+
+Revision ID: 5d3e8c1b7a40
+Revises: 1a9abb91ff1a
+Create Date: 2026-01-22 10:41:05.927113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d3e8c1b7a40'
+down_revision: Union[str, None] = '1a9abb91ff1a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('table_versions',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.execute("INSERT INTO table_versions (table_name, version) VALUES ('dishes', 1), ('clients', 1)")
+
+
+def downgrade() -> None:
+    op.drop_table('table_versions')
@@ -0,0 +1,38 @@
+"""dish meta as jsonb with indexes
+
+Revision ID: 8e4d1f6a2c93
+Revises: 3c9a5e7f21b6
+Create Date: 2026-02-09 11:42:07.265310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4d1f6a2c93'
+down_revision: Union[str, None] = '3c9a5e7f21b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # смена типа переписывает таблицу под ACCESS EXCLUSIVE, поэтому индексы без CONCURRENTLY
+    op.alter_column('dishes', 'meta', type_=postgresql.JSONB(), postgresql_using='meta::jsonb')
+    # meta @> {...}: теги, meta_contains
+    op.create_index(
+        'ix_dishes_meta', 'dishes', ['meta'],
+        postgresql_using='gin', postgresql_ops={'meta': 'jsonb_path_ops'},
+    )
+    # meta -> 'rating' >= x
+    op.create_index('ix_dishes_meta_rating', 'dishes', [sa.text("(meta -> 'rating')")])
+    op.execute("ANALYZE dishes")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dishes_meta_rating', table_name='dishes')
+    op.drop_index('ix_dishes_meta', table_name='dishes')
+    op.alter_column('dishes', 'meta', type_=sa.JSON(), postgresql_using='meta::json')
@@ -0,0 +1,52 @@
+"""add client_spend
+
+Revision ID: 92f9a72bd23c
+Revises: c056aa6c60c6
+Create Date: 2026-01-14 11:02:47.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '92f9a72bd23c'
+down_revision: Union[str, None] = 'c056aa6c60c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('client_spend',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('total_spend', sa.Float(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id')
+    )
+    op.create_index('ix_client_spend_total_spend', 'client_spend', ['total_spend'], unique=False)
+
+    # backfill: как rebuild_client_spend и create_order - каждый заказ, в том числе
+    # без позиций (сумма 0); orders.total ещё нет, сумма заказа по текущим ценам
+    op.execute("""
+        INSERT INTO client_spend (client_id, total_spend, orders_count)
+        SELECT
+          o.client_id,
+          SUM(COALESCE(s.total, 0)),
+          COUNT(*)
+        FROM orders o
+        LEFT JOIN (
+          SELECT oi.order_id, SUM(d.price * oi.quantity) AS total
+          FROM order_items oi
+          JOIN dishes d ON d.id = oi.dish_id
+          GROUP BY oi.order_id
+        ) s ON s.order_id = o.id
+        GROUP BY o.client_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_client_spend_total_spend', table_name='client_spend')
+    op.drop_table('client_spend')
@@ -0,0 +1,58 @@
+"""add order_items.category
+
+Revision ID: a8e4b6d2c0f7
+Revises: d3a7c1e5f9b2
+Create Date: 2026-03-04 15:22:40.918377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e4b6d2c0f7'
+down_revision: Union[str, None] = 'd3a7c1e5f9b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # категория на момент заказа: по ней и запись заказа, и rebuild_daily_revenue
+    op.add_column('order_items', sa.Column('category', sa.String(), nullable=True))
+
+    # backfill: истории категорий нет, берём текущую из dishes
+    op.execute("""
+        UPDATE order_items oi
+        SET category = d.category
+        FROM dishes d
+        WHERE d.id = oi.dish_id
+    """)
+
+    # daily_revenue заново по тому же правилу, иначе в ней остаётся смесь
+    # категорий на момент заказа и на момент прошлого пересчёта
+    op.execute("LOCK TABLE daily_revenue IN EXCLUSIVE MODE")
+    op.execute("DELETE FROM daily_revenue")
+    op.execute("""
+        INSERT INTO daily_revenue (day, category, payment_type, revenue, quantity)
+        SELECT
+          CAST(o.created_at AS date),
+          COALESCE(oi.category, ''),
+          COALESCE(o.payment_type, ''),
+          SUM(oi.unit_price * oi.quantity),
+          SUM(oi.quantity)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id AND oi.created_at = o.created_at
+        GROUP BY 1, 2, 3
+    """)
+    op.execute("""
+        INSERT INTO table_versions (table_name, version, updated_at)
+        VALUES ('daily_revenue', 1, now())
+        ON CONFLICT (table_name) DO UPDATE
+        SET version = table_versions.version + 1, updated_at = now()
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('order_items', 'category')
@@ -0,0 +1,45 @@
+"""add daily_revenue_log
+
+Revision ID: b3d9f1a7c5e2
+Revises: f2c6a8e4d0b5
+Create Date: 2026-03-11 09:55:23.740618
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9f1a7c5e2'
+down_revision: Union[str, None] = 'f2c6a8e4d0b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # дельты daily_revenue из транзакций заказов, переносятся fold_daily_revenue
+    op.create_table('daily_revenue_log',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('payment_type', sa.String(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    # неперенесённые дельты - в daily_revenue
+    op.execute("""
+        INSERT INTO daily_revenue (day, category, payment_type, revenue, quantity)
+        SELECT day, category, payment_type, SUM(revenue), SUM(quantity)
+        FROM daily_revenue_log
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, category, payment_type) DO UPDATE
+        SET revenue = daily_revenue.revenue + excluded.revenue,
+            quantity = daily_revenue.quantity + excluded.quantity
+    """)
+    op.drop_table('daily_revenue_log')
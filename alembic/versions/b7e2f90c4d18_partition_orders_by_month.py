@@ -0,0 +1,157 @@
+"""partition orders and order_items by month
+
+Revision ID: b7e2f90c4d18
+Revises: 5d3e8c1b7a40
+Create Date: 2026-01-27 09:13:44.502871
+
+"""
+from datetime import date, datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f90c4d18'
+down_revision: Union[str, None] = '5d3e8c1b7a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# сколько месяцев вперёд создать сразу; дальше - app/partitions.ensure_partitions
+MONTHS_AHEAD = 3
+
+
+def _next_month(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _months(conn):
+    first = conn.execute(sa.text("SELECT MIN(created_at) FROM orders_old")).scalar() or datetime.utcnow()
+    month = date(first.year, first.month, 1)
+    today = datetime.utcnow().date()
+    last = date(today.year, today.month, 1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        yield month
+        month = _next_month(month)
+
+
+def upgrade() -> None:
+    # Копирование в новые секционированные таблицы под ACCESS EXCLUSIVE:
+    # на больших базах запускать в окно обслуживания.
+    conn = op.get_bind()
+
+    op.execute("ALTER TABLE order_items RENAME TO order_items_old")
+    op.execute("ALTER TABLE orders RENAME TO orders_old")
+    op.execute("UPDATE orders_old SET created_at = timezone('utc', now()) WHERE created_at IS NULL")
+
+    op.execute("""
+        CREATE TABLE orders (
+          id integer NOT NULL DEFAULT nextval('orders_id_seq'),
+          client_id integer NOT NULL,
+          created_at timestamp without time zone NOT NULL,
+          payment_type varchar,
+          status varchar,
+          total double precision NOT NULL
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("""
+        CREATE TABLE order_items (
+          order_id integer NOT NULL,
+          dish_id integer NOT NULL,
+          created_at timestamp without time zone NOT NULL,
+          quantity integer NOT NULL,
+          unit_price double precision NOT NULL
+        ) PARTITION BY RANGE (created_at)
+    """)
+    # иначе последовательность удалится вместе с orders_old
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+
+    for month in _months(conn):
+        suffix = f"y{month.year:04d}m{month.month:02d}"
+        bounds = f"FROM ('{month}') TO ('{_next_month(month)}')"
+        op.execute(f"CREATE TABLE orders_{suffix} PARTITION OF orders FOR VALUES {bounds}")
+        op.execute(f"CREATE TABLE order_items_{suffix} PARTITION OF order_items FOR VALUES {bounds}")
+
+    op.execute("""
+        INSERT INTO orders (id, client_id, created_at, payment_type, status, total)
+        SELECT id, client_id, created_at, payment_type, status, total FROM orders_old
+    """)
+    op.execute("""
+        INSERT INTO order_items (order_id, dish_id, created_at, quantity, unit_price)
+        SELECT oi.order_id, oi.dish_id, o.created_at, oi.quantity, oi.unit_price
+        FROM order_items_old oi
+        JOIN orders_old o ON o.id = oi.order_id
+    """)
+    op.execute("DROP TABLE order_items_old")
+    op.execute("DROP TABLE orders_old")
+
+    # ключи и индексы после загрузки данных; создаются и на всех партициях
+    op.execute("ALTER TABLE orders ADD CONSTRAINT orders_pkey PRIMARY KEY (id, created_at)")
+    op.execute("""
+        ALTER TABLE orders ADD CONSTRAINT orders_client_id_fkey
+        FOREIGN KEY (client_id) REFERENCES clients (id)
+    """)
+    op.create_index('ix_orders_client_id_id', 'orders', ['client_id', 'id'])
+    op.create_index('ix_orders_created_at', 'orders', ['created_at'])
+
+    op.execute("ALTER TABLE order_items ADD CONSTRAINT order_items_pkey PRIMARY KEY (order_id, dish_id, created_at)")
+    op.execute("""
+        ALTER TABLE order_items ADD CONSTRAINT order_items_order_id_fkey
+        FOREIGN KEY (order_id, created_at) REFERENCES orders (id, created_at)
+    """)
+    op.execute("""
+        ALTER TABLE order_items ADD CONSTRAINT order_items_dish_id_fkey
+        FOREIGN KEY (dish_id) REFERENCES dishes (id)
+    """)
+    op.create_index('ix_order_items_dish_id', 'order_items', ['dish_id'])
+    op.execute("ANALYZE orders")
+    op.execute("ANALYZE order_items")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE order_items RENAME TO order_items_part")
+    op.execute("ALTER TABLE orders RENAME TO orders_part")
+    op.execute("ALTER TABLE order_items_part RENAME CONSTRAINT order_items_pkey TO order_items_part_pkey")
+    op.execute("ALTER TABLE orders_part RENAME CONSTRAINT orders_pkey TO orders_part_pkey")
+    op.execute("ALTER INDEX ix_orders_client_id_id RENAME TO ix_orders_part_client_id_id")
+    op.execute("ALTER INDEX ix_orders_created_at RENAME TO ix_orders_part_created_at")
+    op.execute("ALTER INDEX ix_order_items_dish_id RENAME TO ix_order_items_part_dish_id")
+
+    op.execute("""
+        CREATE TABLE orders (
+          id integer NOT NULL DEFAULT nextval('orders_id_seq') PRIMARY KEY,
+          client_id integer NOT NULL REFERENCES clients (id),
+          created_at timestamp without time zone,
+          payment_type varchar,
+          status varchar,
+          total double precision NOT NULL
+        )
+    """)
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+    op.execute("""
+        CREATE TABLE order_items (
+          order_id integer NOT NULL REFERENCES orders (id),
+          dish_id integer NOT NULL REFERENCES dishes (id),
+          quantity integer NOT NULL,
+          unit_price double precision NOT NULL,
+          PRIMARY KEY (order_id, dish_id)
+        )
+    """)
+    op.execute("""
+        INSERT INTO orders (id, client_id, created_at, payment_type, status, total)
+        SELECT id, client_id, created_at, payment_type, status, total FROM orders_part
+    """)
+    op.execute("""
+        INSERT INTO order_items (order_id, dish_id, quantity, unit_price)
+        SELECT order_id, dish_id, quantity, unit_price FROM order_items_part
+    """)
+    # партиции удаляются вместе с родителем
+    op.execute("DROP TABLE order_items_part")
+    op.execute("DROP TABLE orders_part")
+
+    op.create_index('ix_orders_client_id_id', 'orders', ['client_id', 'id'])
+    op.create_index('ix_orders_created_at', 'orders', ['created_at'])
+    op.create_index('ix_order_items_dish_id', 'order_items', ['dish_id'])
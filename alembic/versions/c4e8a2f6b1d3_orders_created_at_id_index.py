@@ -0,0 +1,56 @@
+"""orders: index (created_at, id) instead of (created_at)
+
+Revision ID: c4e8a2f6b1d3
+Revises: b3d9f1a7c5e2
+Create Date: 2026-10-18 20:58:31.417206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f6b1d3'
+down_revision: Union[str, None] = 'b3d9f1a7c5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Проверка FK order_items -> orders (id, created_at) для только что вставленного
+# created_at (вне гистограммы, оценка - 1 строка) выбирала индекс (created_at):
+# у всех заказов /orders/bulk без created_at он один, и каждая проверка читала
+# все такие заказы - пачка квадратична по числу заказов. С (created_at, id)
+# проверка - точный поиск; диапазоны по created_at индекс обслуживает как раньше.
+
+
+def _partitions() -> list[str]:
+    return op.get_bind().execute(sa.text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST('orders' AS regclass)
+        ORDER BY 1
+    """)).scalars().all()
+
+
+def upgrade() -> None:
+    # индекс на родителе без построения (ON ONLY), по партициям - CONCURRENTLY
+    op.execute("CREATE INDEX IF NOT EXISTS ix_orders_created_at_id ON ONLY orders (created_at, id)")
+    partitions = _partitions()
+    with op.get_context().autocommit_block():
+        for name in partitions:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}_created_at_id_idx ON {name} (created_at, id)")
+            op.execute(f"ALTER INDEX ix_orders_created_at_id ATTACH PARTITION {name}_created_at_id_idx")
+    # секционированный индекс CONCURRENTLY не удалить; DROP - короткая блокировка orders
+    op.execute("DROP INDEX IF EXISTS ix_orders_created_at")
+
+
+def downgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_orders_created_at ON ONLY orders (created_at)")
+    partitions = _partitions()
+    with op.get_context().autocommit_block():
+        for name in partitions:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}_created_at_idx ON {name} (created_at)")
+            op.execute(f"ALTER INDEX ix_orders_created_at ATTACH PARTITION {name}_created_at_idx")
+    op.execute("DROP INDEX IF EXISTS ix_orders_created_at_id")
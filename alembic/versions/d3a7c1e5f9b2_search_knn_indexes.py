@@ -0,0 +1,56 @@
+"""search: prefix btree and GiST trigram KNN indexes
+
+Revision ID: d3a7c1e5f9b2
+Revises: 6f1a3b8d2e57
+Create Date: 2026-03-02 11:47:15.203846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a7c1e5f9b2'
+down_revision: Union[str, None] = '6f1a3b8d2e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app/search.py: q < 3 символов - диапазон по (lower(col) COLLATE "C", id),
+# иначе KNN ORDER BY col <->> q по GiST. GIN gin_trgm_ops KNN не умеет -
+# ранжирование сортировало все совпадения, индекс больше не нужен.
+# siglen=256: на 1M клиентов с дефолтной сигнатурой (12 байт) обход GiST
+# читал в разы больше страниц.
+TABLES = [
+    ('dishes', 'name', 'ix_dishes_name_trgm'),
+    ('clients', 'full_name', 'ix_clients_full_name_trgm'),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, column, gin_name in TABLES:
+            op.create_index(
+                f'ix_{table}_{column}_prefix', table,
+                [sa.text(f'(lower({column}) COLLATE "C")'), 'id'],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.create_index(
+                f'ix_{table}_{column}_trgm_gist', table, [column],
+                postgresql_using='gist', postgresql_ops={column: 'gist_trgm_ops(siglen=256)'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.drop_index(gin_name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, column, gin_name in reversed(TABLES):
+            op.create_index(
+                gin_name, table, [column],
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.drop_index(f'ix_{table}_{column}_trgm_gist', table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.drop_index(f'ix_{table}_{column}_prefix', table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,45 @@
+"""add orders.feed_xid
+
+Revision ID: e5b9d3f7a1c4
+Revises: a8e4b6d2c0f7
+Create Date: 2026-03-09 10:14:52.601733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9d3f7a1c4'
+down_revision: Union[str, None] = 'a8e4b6d2c0f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # позиция в /orders/feed (app/order_feed.py). Колонка без DEFAULT, потом
+    # SET DEFAULT: volatile DEFAULT в ADD COLUMN переписал бы все партиции.
+    # Старые заказы остаются с NULL - в ленту они не попадают.
+    op.execute("ALTER TABLE orders ADD COLUMN feed_xid xid8")
+    op.execute("ALTER TABLE orders ALTER COLUMN feed_xid SET DEFAULT pg_current_xact_id()")
+
+    # индекс на родителе без построения (ON ONLY), по партициям - CONCURRENTLY
+    op.execute("CREATE INDEX IF NOT EXISTS ix_orders_feed_xid_id ON ONLY orders (feed_xid, id)")
+    partitions = op.get_bind().execute(sa.text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST('orders' AS regclass)
+        ORDER BY 1
+    """)).scalars().all()
+    with op.get_context().autocommit_block():
+        for name in partitions:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}_feed_xid_id_idx ON {name} (feed_xid, id)")
+            op.execute(f"ALTER INDEX ix_orders_feed_xid_id ATTACH PARTITION {name}_feed_xid_id_idx")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_orders_feed_xid_id")
+    op.execute("ALTER TABLE orders DROP COLUMN feed_xid")
@@ -0,0 +1,40 @@
+"""shard table_versions counters
+
+Revision ID: f2c6a8e4d0b5
+Revises: e5b9d3f7a1c4
+Create Date: 2026-03-10 12:40:07.385102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8e4d0b5'
+down_revision: Union[str, None] = 'e5b9d3f7a1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # версия таблицы = сумма по строкам-шардам (app/versions.py); текущие строки - шард 0
+    op.add_column('table_versions', sa.Column('shard', sa.Integer(), server_default='0', nullable=False))
+    op.drop_constraint('table_versions_pkey', 'table_versions', type_='primary')
+    op.create_primary_key('table_versions_pkey', 'table_versions', ['table_name', 'shard'])
+    op.alter_column('table_versions', 'shard', server_default=None)
+
+
+def downgrade() -> None:
+    # по строке на таблицу с суммой шардов
+    op.execute("""
+        INSERT INTO table_versions (table_name, shard, version, updated_at)
+        SELECT table_name, -1, SUM(version), MAX(updated_at)
+        FROM table_versions
+        GROUP BY table_name
+    """)
+    op.execute("DELETE FROM table_versions WHERE shard <> -1")
+    op.drop_constraint('table_versions_pkey', 'table_versions', type_='primary')
+    op.create_primary_key('table_versions_pkey', 'table_versions', ['table_name'])
+    op.drop_column('table_versions', 'shard')
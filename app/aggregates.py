@@ -0,0 +1,173 @@
+import threading
+from collections import defaultdict
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models import ClientSpend, DailyRevenueLog
+from app.versions import DAILY_REVENUE, bump_version
+
+
+# Добавляет суммы заказов [(client_id, total), ...] в client_spend.
+# Вызывается в транзакции заказа, до commit. POST /orders пишет то же в своём CTE.
+def record_client_spend(db: Session, orders: list[tuple[int, float]]) -> None:
+    spend = defaultdict(float)
+    counts = defaultdict(int)
+    for client_id, total in orders:
+        spend[client_id] += total
+        counts[client_id] += 1
+    if not spend:
+        return
+
+    stmt = insert(ClientSpend)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ClientSpend.client_id],
+        set_={
+            "total_spend": ClientSpend.total_spend + stmt.excluded.total_spend,
+            "orders_count": ClientSpend.orders_count + stmt.excluded.orders_count,
+        },
+    )
+    # одинаковый порядок блокировок строк в параллельных транзакциях
+    db.execute(
+        stmt,
+        [
+            {"client_id": client_id, "total_spend": spend[client_id], "orders_count": counts[client_id]}
+            for client_id in sorted(spend)
+        ],
+    )
+
+
+# Полный пересчёт client_spend по истории заказов (backfill).
+def rebuild_client_spend(db: Session) -> int:
+    # EXCLUSIVE: новые заказы ждут конца пересчёта и потом добавляют свою дельту
+    db.execute(text("LOCK TABLE client_spend IN EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM client_spend"))
+    res = db.execute(text("""
+        INSERT INTO client_spend (client_id, total_spend, orders_count)
+        SELECT
+          o.client_id,
+          SUM(o.total) AS total_spend,
+          COUNT(*) AS orders_count
+        FROM orders o
+        GROUP BY o.client_id
+    """))
+    return res.rowcount
+
+
+# Выручка за день по категории блюда и способу оплаты.
+# lines: [(created_at, category, payment_type, revenue, quantity), ...] - по позициям заказов;
+# category - та же, что пишется в order_items.category (по ней считает rebuild_daily_revenue).
+# NULL в ключе хранится как '' (в daily_revenue ключ - первичный). Вызывается в транзакции заказа, до commit
+# (POST /orders пишет то же в своём CTE).
+# Пишет дельты в daily_revenue_log: upsert в daily_revenue блокировал бы до commit одни и те же
+# строки "сегодня x категория x оплата", и все заказы шли бы по одному. В daily_revenue
+# их сворачивает fold_daily_revenue; /analytics/revenue читает обе таблицы.
+def record_daily_revenue(db: Session, lines: list[tuple]) -> None:
+    revenue = defaultdict(float)
+    quantity = defaultdict(int)
+    for created_at, category, payment_type, line_revenue, line_quantity in lines:
+        key = (created_at.date(), category or "", payment_type or "")
+        revenue[key] += line_revenue
+        quantity[key] += line_quantity
+    if not revenue:
+        return
+
+    db.execute(
+        insert(DailyRevenueLog),
+        [
+            {
+                "day": day,
+                "category": category,
+                "payment_type": payment_type,
+                "revenue": revenue[(day, category, payment_type)],
+                "quantity": quantity[(day, category, payment_type)],
+            }
+            for day, category, payment_type in revenue
+        ],
+    )
+
+
+# Перенос накопленных дельт в daily_revenue одной транзакцией: читатель видит строки
+# либо в логе, либо уже в daily_revenue. Параллельный перенос из другого процесса
+# удалённые строки пропускает. Блокировки в том же порядке, что у rebuild_daily_revenue:
+# сначала лог, потом daily_revenue.
+def fold_daily_revenue(db: Session) -> int:
+    res = db.execute(text("""
+        WITH moved AS (
+          DELETE FROM daily_revenue_log
+          RETURNING day, category, payment_type, revenue, quantity
+        )
+        INSERT INTO daily_revenue (day, category, payment_type, revenue, quantity)
+        SELECT day, category, payment_type, SUM(revenue), SUM(quantity)
+        FROM moved
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        ON CONFLICT (day, category, payment_type) DO UPDATE
+        SET revenue = daily_revenue.revenue + excluded.revenue,
+            quantity = daily_revenue.quantity + excluded.quantity
+    """))
+    return res.rowcount
+
+
+def start_revenue_folds(interval: float) -> Optional[threading.Event]:
+    # 0 = не переносить (лог растёт, ответы /analytics/revenue всё равно полные)
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            db = SessionLocal()
+            try:
+                fold_daily_revenue(db)
+                db.commit()
+            except Exception:
+                db.rollback()  # БД недоступна и т.п. - следующая попытка через interval
+            finally:
+                db.close()
+
+    threading.Thread(target=loop, name="daily-revenue-fold", daemon=True).start()
+    return stop
+
+
+# Пересчёт daily_revenue за [date_from, date_to] (или за всё время) по заказам.
+# Категория - order_items.category на момент заказа, как и при записи заказа:
+# смена категории блюда историю не меняет. Читаются только партиции периода.
+def rebuild_daily_revenue(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> int:
+    conditions = ["TRUE"]
+    order_conditions = ["TRUE"]
+    params = {}
+    if date_from is not None:
+        conditions.append("day >= :date_from")
+        order_conditions.append("o.created_at >= :date_from")
+        params["date_from"] = date_from
+    if date_to is not None:
+        conditions.append("day <= :date_to")
+        order_conditions.append("o.created_at < CAST(:date_to AS date) + 1")
+        params["date_to"] = date_to
+
+    # EXCLUSIVE: новые заказы ждут конца пересчёта и потом добавляют свою дельту;
+    # дельты периода в логе уже входят в пересчёт по заказам
+    db.execute(text("LOCK TABLE daily_revenue_log, daily_revenue IN EXCLUSIVE MODE"))
+    db.execute(text(f"DELETE FROM daily_revenue_log WHERE {' AND '.join(conditions)}"), params)
+    db.execute(text(f"DELETE FROM daily_revenue WHERE {' AND '.join(conditions)}"), params)
+    res = db.execute(text(f"""
+        INSERT INTO daily_revenue (day, category, payment_type, revenue, quantity)
+        SELECT
+          CAST(o.created_at AS date),
+          COALESCE(oi.category, ''),
+          COALESCE(o.payment_type, ''),
+          SUM(oi.unit_price * oi.quantity),
+          SUM(oi.quantity)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id AND oi.created_at = o.created_at
+        WHERE {' AND '.join(order_conditions)}
+        GROUP BY 1, 2, 3
+    """), params)
+    # суммы могли измениться без новых заказов: ETag /analytics/revenue
+    bump_version(db, DAILY_REVENUE)
+    return res.rowcount
@@ -0,0 +1,108 @@
+import inspect
+
+from fastapi import APIRouter, params
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from app.db import get_async_db, get_async_read_db, get_db, get_read_db
+
+# Async-режим (DB_ASYNC=1): те же эндпоинты, но вместо sync-сессии из пула
+# потоков получают AsyncSession и выполняются через AsyncSession.run_sync.
+# Код запросов внутри run_sync работает в greenlet поверх asyncpg, поэтому
+# ожидание Postgres не занимает поток threadpool - но сам Python-код обработчика
+# выполняется в event loop. Поэтому тяжёлое по CPU из него вынесено: разбор и
+# валидация bulk-тел - в threadpool (app/bulk.py), валидация по response_model и
+# JSON ответа - тоже (render ниже). Ответ отдаётся готовым Response, и FastAPI
+# не валидирует его второй раз.
+
+ASYNC_DEPENDENCIES = {get_db: get_async_db, get_read_db: get_async_read_db}
+
+
+def _sync_db_params(endpoint) -> list[str]:
+    names = []
+    for p in inspect.signature(endpoint).parameters.values():
+        if isinstance(p.default, params.Depends) and p.default.dependency in ASYNC_DEPENDENCIES:
+            names.append(p.name)
+    return names
+
+
+def _async_endpoint(route: APIRoute, db_param: str):
+    endpoint = route.endpoint
+    sig = inspect.signature(endpoint)
+    new_params = [
+        p.replace(
+            default=params.Depends(ASYNC_DEPENDENCIES[p.default.dependency]),
+            annotation=AsyncSession,
+        )
+        if p.name == db_param
+        else p
+        for p in sig.parameters.values()
+    ]
+
+    response_params = [p.name for p in sig.parameters.values() if p.annotation is Response]
+    adapter = TypeAdapter(route.response_model) if route.response_model else None
+
+    def call(session, kwargs):
+        result = endpoint(**{db_param: session}, **kwargs)
+        if adapter is not None and not isinstance(result, Response) and not _plain(result):
+            # ORM-объекты - внутри run_sync: lazy load вне greenlet невозможен
+            result = adapter.validate_python(result, from_attributes=True)
+        return result
+
+    def render(result) -> bytes:
+        return adapter.dump_json(adapter.validate_python(result, from_attributes=True), by_alias=True)
+
+    async def wrapper(**kwargs):
+        db = kwargs.pop(db_param)
+        result = await db.run_sync(call, kwargs)
+        if adapter is None or isinstance(result, Response):
+            return result
+
+        response = Response(await run_in_threadpool(render, result), media_type="application/json")
+        # то, что FastAPI сделал бы с Depends-Response: заголовки и status_code
+        sub = kwargs.get(response_params[0]) if response_params else None
+        response.status_code = (sub.status_code if sub is not None else None) or route.status_code or 200
+        if sub is not None:
+            response.headers.raw.extend(sub.headers.raw)
+        return response
+
+    wrapper.__signature__ = sig.replace(parameters=new_params)
+    wrapper.__name__ = endpoint.__name__
+    wrapper.__doc__ = endpoint.__doc__
+    return wrapper
+
+
+def _plain(result) -> bool:
+    # dict/модели (сводки bulk, задачи) валидируются в threadpool целиком
+    items = result if isinstance(result, list) else [result]
+    return all(isinstance(item, (dict, BaseModel)) for item in items)
+
+
+def make_async_router(router: APIRouter) -> APIRouter:
+    async_router = APIRouter()
+    for route in router.routes:
+        db_params = _sync_db_params(route.endpoint) if isinstance(route, APIRoute) else []
+        if len(db_params) != 1:
+            async_router.routes.append(route)
+            continue
+
+        async_router.add_api_route(
+            route.path,
+            _async_endpoint(route, db_params[0]),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            dependencies=route.dependencies,
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=route.responses,
+            name=route.name,
+            include_in_schema=route.include_in_schema,
+            response_class=route.response_class,
+        )
+    return async_router
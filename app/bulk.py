@@ -0,0 +1,134 @@
+import json
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+# Общие части bulk-эндпоинтов (/orders/bulk, PUT /dishes/bulk, PUT /clients/bulk):
+# разбор тела, построчная валидация и результат по каждой строке (index - позиция во входе).
+
+BULK_BATCH_SIZE = 1000
+
+
+def bulk_rows(schema: type[BaseModel]):
+    """Depends(bulk_rows(Schema)) -> (valid, results) как у validate_rows.
+    Разбор JSON и валидация - в threadpool: в async-режиме (DB_ASYNC=1) обработчик
+    выполняется в event loop, и пачка в десятки тысяч строк остановила бы его."""
+
+    async def dependency(request: Request) -> tuple[list, list[dict]]:
+        body = await request.body()
+        content_type = request.headers.get("content-type", "")
+        return await run_in_threadpool(_parse_and_validate, body, content_type, schema)
+
+    return dependency
+
+
+def _parse_and_validate(body: bytes, content_type: str, schema: type[BaseModel]) -> tuple[list, list[dict]]:
+    return validate_rows(parse_rows(body, content_type), schema)
+
+
+def parse_rows(body: bytes, content_type: str) -> list:
+    # JSON-массив или NDJSON (по одному объекту на строку)
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(None)
+        return rows
+
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    return rows
+
+
+def rejected(index: int, error: str) -> dict:
+    return {"index": index, "status": "rejected", "error": error}
+
+
+def validate_rows(rows: list, schema: type[BaseModel]) -> tuple[list, list[dict]]:
+    valid, results = [], []
+    for index, raw in enumerate(rows):
+        if not isinstance(raw, dict):
+            results.append(rejected(index, "Expected a JSON object"))
+            continue
+        try:
+            valid.append((index, schema.model_validate(raw)))
+        except ValidationError as e:
+            err = e.errors()[0]
+            results.append(rejected(index, f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"))
+    return valid, results
+
+
+def upsert_rows(db: Session, model, valid: list) -> list[dict]:
+    """PUT-семантика: строка с id заменяет запись целиком (или создаёт её с этим id),
+    строка без id - новая запись. Запросов на пачку из BULK_BATCH_SIZE строк -
+    не больше трёх, независимо от числа строк."""
+    table = model.__table__
+    columns = [c.name for c in table.columns if c.name != "id"]
+    results = []
+    with_id, without_id = [], []
+    seen = set()
+    for index, row in valid:
+        values = row.model_dump(include=set(columns) | {"id"})
+        if values["id"] is None:
+            del values["id"]
+            without_id.append((index, values))
+        elif values["id"] in seen:
+            # ON CONFLICT DO UPDATE не может изменить одну строку дважды в одном запросе
+            results.append(rejected(index, f"Duplicate id: {values['id']}"))
+        else:
+            seen.add(values["id"])
+            with_id.append((index, values))
+
+    stmt = insert(table)
+    # xmax = 0 у только что вставленной версии строки, у обновлённой - id нашей транзакции
+    upsert = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={c: stmt.excluded[c] for c in columns},
+    ).returning(table.c.id, literal_column("xmax = 0"))
+
+    for start in range(0, len(with_id), BULK_BATCH_SIZE):
+        batch = with_id[start:start + BULK_BATCH_SIZE]
+        created = dict(db.execute(upsert, [values for _, values in batch]).all())
+        for index, values in batch:
+            status = "created" if created[values["id"]] else "updated"
+            results.append({"index": index, "status": status, "id": values["id"]})
+
+    if with_id:
+        # явные id могли обогнать последовательность - сдвигаем её (только вперёд)
+        # до вставки строк без id, иначе nextval выдал бы уже занятый id
+        db.execute(
+            text("""
+                SELECT setval(CAST(seq AS regclass), GREATEST(nextval(CAST(seq AS regclass)), :max_id))
+                FROM pg_get_serial_sequence(:table, 'id') AS seq
+            """),
+            {"table": table.name, "max_id": max(values["id"] for _, values in with_id)},
+        )
+
+    insert_rows = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    for start in range(0, len(without_id), BULK_BATCH_SIZE):
+        batch = without_id[start:start + BULK_BATCH_SIZE]
+        ids = db.execute(insert_rows, [values for _, values in batch]).scalars().all()
+        for new_id, (index, _) in zip(ids, batch):
+            results.append({"index": index, "status": "created", "id": new_id})
+
+    return results
+
+
+def upsert_summary(results: list[dict]) -> dict:
+    results.sort(key=lambda r: r["index"])
+    counts = {"created": 0, "updated": 0, "rejected": 0}
+    for r in results:
+        counts[r["status"]] += 1
+    return {**counts, "results": results}
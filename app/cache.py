@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Dish
+from app.schemas import DishOut
+from app.versions import current_version
+
+# In-process кэш каталога блюд (на воркер).
+# Ключи: ("dish", id) -> dict, ("list", ...) -> результат list_dishes. Отсутствие
+# блюда не кэшируется: его могли только что создать на другом воркере.
+# Кэш действителен для одной версии dishes из table_versions (db_version) - той же,
+# по которой считается ETag: чтения передают версию, прочитанную в запросе, и если
+# она новее, кэш очищается. Так запись на любом воркере сбрасывает кэш всех
+# воркеров при их следующем чтении, а тело ответа не старше своего ETag.
+# Без версии (пути записи заказов, also_ordered) get_dishes сам читает её из
+# table_versions - один запрос по PK: цены и наличие блюд в заказе не старше
+# последней закоммиченной записи в dishes.
+# Запись в dishes на этом воркере после commit ещё и вызывает invalidate().
+
+_MISSING = object()
+
+
+def dish_to_dict(dish: Dish) -> dict:
+    return DishOut.model_validate(dish).model_dump()
+
+
+class DishCatalogCache:
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.version = 0  # локальный счётчик очисток: не класть значения, загруженные до очистки
+        self.db_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def sync(self, db_version: Optional[int]) -> None:
+        if db_version is None:
+            return
+        with self._lock:
+            # более старая версия (запрос прочитал её до чужого commit) кэш не откатывает
+            if self.db_version is not None and db_version <= self.db_version:
+                return
+            self.db_version = db_version
+            self.version += 1
+            self._entries.clear()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return _MISSING
+
+    def _put(self, key, value, version: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            # пока грузили из БД, каталог мог измениться - такое значение не кладём
+            if version != self.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_dishes(self, db: Session, dish_ids, db_version: Optional[int] = None) -> dict[int, dict]:
+        if self.enabled:
+            self.sync(db_version if db_version is not None else current_version(db, "dishes"))
+        found = {}
+        missing = []
+        for dish_id in set(dish_ids):
+            value = self._get(("dish", dish_id))
+            if value is _MISSING:
+                missing.append(dish_id)
+            else:
+                found[dish_id] = value
+
+        if missing:
+            version = self.version
+            loaded = {d.id: dish_to_dict(d) for d in db.query(Dish).filter(Dish.id.in_(missing))}
+            for dish_id, value in loaded.items():
+                self._put(("dish", dish_id), value, version)
+            found.update(loaded)
+        return found
+
+    def get_dish(self, db: Session, dish_id: int, db_version: Optional[int] = None) -> Optional[dict]:
+        return self.get_dishes(db, [dish_id], db_version).get(dish_id)
+
+    def get_list(self, key: tuple, loader: Callable, db_version: int):
+        self.sync(db_version)
+        value = self._get(("list",) + key)
+        if value is _MISSING:
+            version = self.version
+            value = loader()
+            self._put(("list",) + key, value, version)
+        return value
+
+    def invalidate(self, dish: Optional[Dish] = None):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+        if dish is not None:
+            # write-through для только что сохранённого блюда
+            self._put(("dish", dish.id), dish_to_dict(dish), self.version)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "db_version": self.db_version,
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+dish_cache = DishCatalogCache(settings.dish_cache_ttl_seconds, settings.dish_cache_max_size)
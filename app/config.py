@@ -0,0 +1,55 @@
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url: str
+    async_database_url: Optional[str] = None
+    db_async: bool = False
+
+    # реплика для чтения (read-only маршруты); пусто = всё через primary
+    replica_database_url: Optional[str] = None
+    async_replica_database_url: Optional[str] = None
+
+    # пул соединений (QueuePool)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 0  # 0 = без ограничения
+
+    # in-process кэш каталога блюд; 0 = выключен
+    dish_cache_ttl_seconds: float = 60.0
+    dish_cache_max_size: int = 10000
+
+    # X-Query-Count / X-DB-Time-Ms в ответах (для разработки)
+    metrics_query_count_header: bool = False
+
+    # orjson без валидации response_model на горячих чтениях (app/responses.py)
+    fast_json: bool = False
+
+    # партиции orders/order_items: на сколько месяцев вперёд и как часто проверять (lifespan)
+    partition_months_ahead: int = 3
+    partition_check_seconds: float = 3600.0
+
+    # перенос daily_revenue_log в daily_revenue (app/aggregates.py), 0 = не переносить
+    daily_revenue_fold_seconds: float = 5.0
+
+    # фоновое повышение цен (app/price_jobs.py): блюд на транзакцию и пауза между ними
+    price_job_chunk_size: int = 500
+    price_job_pause_ms: int = 0
+    # running-задача без прогресса дольше этого считается брошенной и продолжается
+    # (app/price_jobs.py); больше времени одной порции с паузой; 0 = не подбирать
+    price_job_stale_seconds: float = 300.0
+
+    # /dishes/{id}/also_ordered (app/recommendations.py): длина списка и период полной пересборки,
+    # 0 = собрать один раз при старте
+    also_ordered_top_n: int = 50
+    also_ordered_rebuild_seconds: float = 600.0
+
+
+settings = Settings()
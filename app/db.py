@@ -1,15 +1,158 @@
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+import re
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+
+class _TimedPoolMixin:
+    # сколько запрос ждёт соединение из пула (включая открытие нового)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - start, timed_out)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
 
-load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
 
-engine = create_engine(DATABASE_URL)
+
+def _connect_args(is_async: bool) -> dict:
+    timeout = settings.db_statement_timeout_ms
+    if not timeout:
+        return {}
+    if is_async:
+        return {"server_settings": {"statement_timeout": str(timeout)}}
+    return {"options": f"-c statement_timeout={timeout}"}
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    stats = pool.wait_stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.db_max_overflow,
+        "waits": stats.waits,
+        "avg_wait_ms": round(stats.total_wait / stats.waits * 1000, 3) if stats.waits else 0.0,
+        "max_wait_ms": round(stats.max_wait * 1000, 3),
+        "timeouts": stats.timeouts,
+    }
+
+
+DATABASE_URL = settings.database_url
+
+# DB_ASYNC=1 -> роутеры работают через create_async_engine (asyncpg)
+DB_ASYNC = settings.db_async
+ASYNC_DATABASE_URL = settings.async_database_url or make_url(DATABASE_URL).set(
+    drivername="postgresql+asyncpg"
+)
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    connect_args=_connect_args(is_async=False),
+    **_pool_options(),
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+async_engine = (
+    create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=TimedAsyncQueuePool,
+        connect_args=_connect_args(is_async=True),
+        **_pool_options(),
+    )
+    if DB_ASYNC
+    else None
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False)
+
+# Реплика (REPLICA_DATABASE_URL): свой пул, в неё идут read-only маршруты через
+# get_read_db. Без реплики get_read_db отдаёт обычную сессию primary.
+REPLICA_DATABASE_URL = settings.replica_database_url or None
+ASYNC_REPLICA_DATABASE_URL = settings.async_replica_database_url or (
+    make_url(REPLICA_DATABASE_URL).set(drivername="postgresql+asyncpg") if REPLICA_DATABASE_URL else None
+)
+
+replica_engine = (
+    create_engine(
+        REPLICA_DATABASE_URL,
+        poolclass=TimedQueuePool,
+        connect_args=_connect_args(is_async=False),
+        **_pool_options(),
+    )
+    if REPLICA_DATABASE_URL
+    else None
+)
+ReplicaSessionLocal = sessionmaker(bind=replica_engine, autoflush=False, autocommit=False)
+
+async_replica_engine = (
+    create_async_engine(
+        ASYNC_REPLICA_DATABASE_URL,
+        poolclass=TimedAsyncQueuePool,
+        connect_args=_connect_args(is_async=True),
+        **_pool_options(),
+    )
+    if DB_ASYNC and ASYNC_REPLICA_DATABASE_URL
+    else None
+)
+AsyncReplicaSessionLocal = async_sessionmaker(bind=async_replica_engine, autoflush=False)
+
+# для чтений мимо сессии (стриминг экспорта)
+read_engine = replica_engine if replica_engine is not None else engine
+
 Base = declarative_base()
 
 def get_db():
@@ -18,3 +161,66 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Read-your-writes: после записи клиент получает LSN коммита (X-Last-Write-LSN)
+# и может передать его в X-Read-After-LSN. Если реплика ещё не проиграла WAL
+# до этого LSN, запрос читает с primary.
+LSN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+REPLICA_CAUGHT_UP = text(
+    # NULL, если это не standby (например, REPLICA_DATABASE_URL указывает на primary)
+    "SELECT COALESCE(pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn), true)"
+)
+
+
+def _read_after_lsn(request: Request) -> Optional[str]:
+    lsn = request.headers.get("x-read-after-lsn")
+    return lsn if lsn and LSN.match(lsn) else None
+
+
+def set_write_lsn(db, response: Response) -> None:
+    # вызывать после commit (в async-режиме - тоже sync-сессия внутри run_sync)
+    if replica_engine is None:
+        return
+    response.headers["X-Last-Write-LSN"] = db.execute(
+        # asyncpg отдаёт pg_lsn числом
+        text("SELECT CAST(pg_current_wal_lsn() AS text)")
+    ).scalar()
+
+
+def get_read_db(request: Request):
+    if replica_engine is None:
+        yield from get_db()
+        return
+
+    lsn = _read_after_lsn(request)
+    db = ReplicaSessionLocal()
+    try:
+        if lsn and not db.execute(REPLICA_CAUGHT_UP, {"lsn": lsn}).scalar():
+            db.close()
+            db = SessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    if async_replica_engine is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    lsn = _read_after_lsn(request)
+    db = AsyncReplicaSessionLocal()
+    try:
+        if lsn and not (await db.execute(REPLICA_CAUGHT_UP, {"lsn": lsn})).scalar():
+            await db.close()
+            db = AsyncSessionLocal()
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,39 @@
+import json
+from typing import Optional
+
+from fastapi import HTTPException
+
+# Фильтры по dishes.meta (JSONB) для list_dishes и /analytics/dishes/filter_sql.
+# Теги и meta_contains - вхождение meta @> {...} (GIN ix_dishes_meta, jsonb_path_ops),
+# рейтинг - x <= meta -> 'rating' < false (btree ix_dishes_meta_rating). Выражения
+# совпадают с индексами, иначе планировщик их не использует.
+# Условия добавляются только для заданных фильтров (как created_at_range_sql).
+
+
+def meta_filter_sql(
+    tags: Optional[list[str]], min_rating: Optional[float], meta_contains: Optional[str]
+) -> tuple[list[str], dict]:
+    conditions = []
+    params = {}
+    if tags:
+        # все перечисленные теги сразу
+        conditions.append("meta @> CAST(CAST(:meta_tags AS text) AS jsonb)")
+        params["meta_tags"] = json.dumps({"tags": tags})
+    if meta_contains:
+        try:
+            doc = json.loads(meta_contains)
+        except ValueError:
+            doc = None
+        if not isinstance(doc, dict):
+            raise HTTPException(status_code=400, detail="meta_contains must be a JSON object")
+        conditions.append("meta @> CAST(CAST(:meta_contains AS text) AS jsonb)")
+        params["meta_contains"] = json.dumps(doc)
+    if min_rating is not None:
+        # порядок jsonb: объект > массив > boolean > число > строка > null; числа между
+        # собой - по значению. Верхняя граница "< false" оставляет только числа (без неё
+        # "rating": true прошёл бы >= 4) и остаётся условием того же диапазона в индексе
+        conditions.append(
+            "meta -> 'rating' >= to_jsonb(CAST(:min_rating AS numeric)) AND meta -> 'rating' < 'false'::jsonb"
+        )
+        params["min_rating"] = min_rating
+    return conditions, params
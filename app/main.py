@@ -1,16 +1,85 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from app.aggregates import start_revenue_folds
+from app.async_routes import make_async_router
+from app.cache import dish_cache
+from app.config import settings
+from app.db import DB_ASYNC, async_engine, async_replica_engine, engine, pool_status, replica_engine
+from app.metrics import MetricsMiddleware, instrument_engine, registry
+from app.partitions import start_partition_checks
+from app.price_jobs import job_runner
+from app.recommendations import also_ordered
 from app.routers.dishes import router as dishes_router
 from app.routers.clients import router as clients_router
-from app.routers.orders import router as orders_router
+from app.routers.orders import order_feed, router as orders_router
 from app.routers.analytics import router as analytics_router
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop_partition_checks = start_partition_checks(
+        settings.partition_months_ahead, settings.partition_check_seconds
+    )
+    stop_rebuilds = also_ordered.start_scheduler(settings.also_ordered_rebuild_seconds)
+    stop_job_recovery = job_runner.start_recovery(settings.price_job_stale_seconds)
+    stop_revenue_folds = start_revenue_folds(settings.daily_revenue_fold_seconds)
+    yield
+    if stop_revenue_folds is not None:
+        stop_revenue_folds.set()
+    stop_rebuilds.set()
+    also_ordered.stop()
+    if stop_job_recovery is not None:
+        stop_job_recovery.set()
+    job_runner.stop()
+    order_feed.stop()
+    stop_partition_checks.set()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine)
+if async_replica_engine is not None:
+    instrument_engine(async_replica_engine.sync_engine)
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
-app.include_router(dishes_router)
-app.include_router(clients_router)
-app.include_router(orders_router)
-app.include_router(analytics_router)
+
+@app.get("/health/pool")
+def health_pool():
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine) if async_engine is not None else None,
+        "replica": pool_status(replica_engine) if replica_engine is not None else None,
+        "async_replica": (
+            pool_status(async_replica_engine.sync_engine) if async_replica_engine is not None else None
+        ),
+    }
+
+
+@app.get("/health/cache")
+def health_cache():
+    return {"dishes": dish_cache.stats(), "also_ordered": also_ordered.stats()}
+
+
+@app.get("/health/feed")
+def health_feed():
+    return order_feed.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+for router in (dishes_router, clients_router, orders_router, analytics_router):
+    app.include_router(make_async_router(router) if DB_ASYNC else router)
@@ -0,0 +1,177 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+
+# Метрики по маршрутам (на воркер) в формате Prometheus.
+# MetricsMiddleware кладёт в contextvar статистику текущего запроса, а хуки
+# before/after_cursor_execute движков SQLAlchemy добавляют в неё число
+# запросов, время в БД и число строк. Контекст копируется и в threadpool
+# (sync-эндпоинты), и в run_sync (async-режим), так что запросы попадают
+# в свой HTTP-запрос. SQL вне HTTP-запроса (скрипты, старт) не считается.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "rows")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.rows = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: dict[tuple, RouteMetrics] = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route, str(status))
+        with self._lock:
+            m = self._routes.get(key)
+            if m is None:
+                m = self._routes[key] = RouteMetrics()
+            m.latency.observe(seconds)
+            m.queries.observe(stats.queries)
+            m.db_time += stats.db_time
+            m.rows += stats.rows
+
+    def render(self) -> str:
+        with self._lock:
+            items = sorted(self._routes.items())
+            lines = []
+            _histogram(lines, "http_request_duration_seconds",
+                       "Request latency by route.", items, lambda m: m.latency)
+            _histogram(lines, "http_request_db_queries",
+                       "SQL statements executed per request.", items, lambda m: m.queries)
+            _counter(lines, "http_request_db_seconds_total",
+                     "Time spent in SQL statements.", items, lambda m: m.db_time)
+            _counter(lines, "http_request_db_rows_total",
+                     "Rows returned or affected by SQL statements.", items, lambda m: m.rows)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: tuple, **extra) -> str:
+    method, route, status = key
+    pairs = [("method", method), ("route", route), ("status", status), *extra.items()]
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _histogram(lines, name, help_text, items, get):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, m in items:
+        h = get(m)
+        for bound, count in zip(h.buckets, h.counts):
+            lines.append(f"{name}_bucket{_labels(key, le=str(bound))} {count}")
+        lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {h.count}")
+        lines.append(f"{name}_sum{_labels(key)} {h.sum}")
+        lines.append(f"{name}_count{_labels(key)} {h.count}")
+
+
+def _counter(lines, name, help_text, items, get):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for key, m in items:
+        lines.append(f"{name}{_labels(key)} {get(m)}")
+
+
+registry = MetricsRegistry()
+
+
+# ---------- SQLAlchemy ----------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        stats.db_time += time.perf_counter() - starts.pop()
+    stats.queries += 1
+    # у server-side курсоров (stream_results) rowcount = -1
+    if cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------- ASGI ----------
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.metrics_query_count_header:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-query-count", str(stats.queries).encode()),
+                        (b"x-db-time-ms", f"{stats.db_time * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            # шаблон пути, а не сам путь: /orders/{order_id}, а не /orders/42
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            registry.record(scope["method"], path, status, time.perf_counter() - start, stats)
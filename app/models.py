@@ -1,11 +1,22 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, JSON
+from sqlalchemy import (
+    BigInteger, Column, Integer, String, Float, ForeignKey, ForeignKeyConstraint, Date, DateTime, Index, func, text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import UserDefinedType
 
 from app.db import Base
 
 
+class Xid8(UserDefinedType):
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "xid8"
+
+
 class Dish(Base):
     __tablename__ = "dishes"
 
@@ -16,10 +27,26 @@ class Dish(Base):
     calories = Column(Integer)
     portion_grams = Column(Integer)
     category = Column(String)
-    meta = Column(JSON)
+    meta = Column(JSONB)
 
     order_items = relationship("OrderItem", back_populates="dish")
 
+    __table_args__ = (
+        Index("ix_dishes_category_calories", "category", "calories"),
+        Index("ix_dishes_price_id", "price", "id"),
+        Index("ix_dishes_calories_id", "calories", "id"),
+        Index("ix_dishes_name_id", "name", "id"),
+        # фильтры app/dish_meta.py
+        Index("ix_dishes_meta", "meta", postgresql_using="gin", postgresql_ops={"meta": "jsonb_path_ops"}),
+        Index("ix_dishes_meta_rating", text("(meta -> 'rating')")),
+        # поиск q= (app/search.py)
+        Index("ix_dishes_name_prefix", text('(lower(name) COLLATE "C")'), "id"),
+        Index(
+            "ix_dishes_name_trgm_gist", "name",
+            postgresql_using="gist", postgresql_ops={"name": "gist_trgm_ops(siglen=256)"},
+        ),
+    )
+
 
 class Client(Base):
     __tablename__ = "clients"
@@ -34,25 +61,124 @@ class Client(Base):
 
     orders = relationship("Order", back_populates="client")
 
+    __table_args__ = (
+        Index("ix_clients_organization_id", "organization", "id"),
+        Index("ix_clients_age_id", "age", "id"),
+        Index("ix_clients_full_name_id", "full_name", "id"),
+        # поиск q= (app/search.py)
+        Index("ix_clients_full_name_prefix", text('(lower(full_name) COLLATE "C")'), "id"),
+        Index(
+            "ix_clients_full_name_trgm_gist", "full_name",
+            postgresql_using="gist", postgresql_ops={"full_name": "gist_trgm_ops(siglen=256)"},
+        ),
+    )
+
 
 class Order(Base):
+    # секционирована по месяцам created_at (app/partitions.py), поэтому он входит в PK;
+    # id уникален за счёт общей последовательности
     __tablename__ = "orders"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     payment_type = Column(String)
+    total = Column(Float, nullable=False, default=0)
+    # xid записавшей транзакции: позиция в /orders/feed (app/order_feed.py); NULL - заказы до ленты
+    feed_xid = Column(Xid8, server_default=text("pg_current_xact_id()"))
 
     client = relationship("Client", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_orders_client_id_id", "client_id", "id"),
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_feed_xid_id", "feed_xid", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
-    order_id = Column(Integer, ForeignKey("orders.id"), primary_key=True)
+    order_id = Column(Integer, primary_key=True)
     dish_id = Column(Integer, ForeignKey("dishes.id"), primary_key=True)
+    created_at = Column(DateTime, primary_key=True)  # = orders.created_at, ключ секционирования
     quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=False)  # цена блюда на момент заказа
+    category = Column(String)  # категория блюда на момент заказа (daily_revenue)
 
     order = relationship("Order", back_populates="items")
     dish = relationship("Dish", back_populates="order_items")
+
+    __table_args__ = (
+        ForeignKeyConstraint(["order_id", "created_at"], ["orders.id", "orders.created_at"]),
+        Index("ix_order_items_dish_id", "dish_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+class ClientSpend(Base):
+    # сводка по тратам клиента, обновляется в той же транзакции, что и заказ
+    __tablename__ = "client_spend"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    total_spend = Column(Float, nullable=False, default=0)
+    orders_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_client_spend_total_spend", "total_spend"),)
+
+
+class DailyRevenue(Base):
+    # выручка по дням x категория блюда x способ оплаты; сюда периодически сворачивается
+    # daily_revenue_log (app/aggregates.py). '' в category / payment_type = не указано
+    __tablename__ = "daily_revenue"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    payment_type = Column(String, primary_key=True)
+    revenue = Column(Float, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+
+
+class DailyRevenueLog(Base):
+    # дельты daily_revenue из транзакций заказов, только INSERT - без общих строк и их блокировок
+    __tablename__ = "daily_revenue_log"
+
+    id = Column(BigInteger, primary_key=True)
+    day = Column(Date, nullable=False)
+    category = Column(String, nullable=False)
+    payment_type = Column(String, nullable=False)
+    revenue = Column(Float, nullable=False)
+    quantity = Column(Integer, nullable=False)
+
+
+class TableVersion(Base):
+    # счётчик изменений таблицы для ETag / Last-Modified (app/versions.py)
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True)  # счётчик разбит на строки (app/versions.py)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class PriceUpdateJob(Base):
+    # фоновое повышение цен порциями (app/price_jobs.py)
+    __tablename__ = "price_update_jobs"
+
+    id = Column(Integer, primary_key=True)
+    category = Column(String, nullable=False)
+    min_calories = Column(Integer, nullable=False)
+    percent = Column(Float, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    # pending -> running -> done | cancelled | failed
+    status = Column(String, nullable=False, default="pending")
+    max_id = Column(Integer)  # блюда, созданные после старта задачи, не трогаем
+    last_id = Column(Integer, nullable=False, default=0)  # keyset-позиция: обработаны id <= last_id
+    total = Column(Integer)
+    updated = Column(Integer, nullable=False, default=0)
+    error = Column(String)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
@@ -0,0 +1,187 @@
+import asyncio
+import re
+import select
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy import text
+
+from app.db import engine
+
+# Живая лента заказов (GET /orders/feed, server-sent events) для экранов кухни.
+# Позиция в ленте - (orders.feed_xid, orders.id): feed_xid - xid транзакции,
+# записавшей заказ (DEFAULT pg_current_xact_id()). id заказа позицией быть не
+# может: он берётся из sequence до commit, и заказ 10, закоммиченный после заказа
+# 11, остался бы позади курсора. Читаются только заказы с feed_xid меньше xmin
+# снимка: все такие транзакции уже завершены, и новых строк позади курсора не
+# появится. Заказы ещё открытой транзакции ждут её конца (как и более новые
+# заказы, если какая-то транзакция записи долго открыта).
+# create_order и /orders/bulk делают pg_notify(FEED_CHANNEL) - Postgres будит
+# слушателя в момент commit; без уведомлений позиция перечитывается раз в POLL_SECONDS.
+# На воркер одно выделенное соединение с LISTEN (поток order-feed-listener):
+# страница заказов читается одним запросом, готовый JSON раздаётся в
+# asyncio.Queue всех подписчиков. Число экранов не влияет на нагрузку на БД.
+# Тот же класс с другим load и CallbackSubscriber - лента заказов для
+# рекомендаций (app/recommendations.py).
+# Подписчик, у которого в очереди уже > FEED_QUEUE_LIMIT заказов, отключается
+# и переподключается с Last-Event-ID.
+
+FEED_CHANNEL = "orders_feed"
+FEED_PAGE_SIZE = 500
+FEED_QUEUE_LIMIT = 1000
+POLL_SECONDS = 1.0
+RECONNECT_SECONDS = 2.0
+
+EVENT_ID = re.compile(r"^(\d+)\.(\d+)$")
+
+
+def notify_orders(db) -> None:
+    # вызывать до commit; доставка - при commit, при rollback уведомления не будет
+    db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": FEED_CHANNEL})
+
+
+def feed_head(conn) -> tuple[int, int]:
+    # позиция "сейчас": всё, что закоммитят после, будет после неё
+    return int(conn.execute(text("SELECT CAST(pg_snapshot_xmin(pg_current_snapshot()) AS text)")).scalar()), 0
+
+
+def format_event_id(position: tuple[int, int]) -> str:
+    return f"{position[0]}.{position[1]}"
+
+
+def parse_event_id(value: Optional[str]) -> Optional[tuple[int, int]]:
+    m = EVENT_ID.match(value or "")
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+
+class Subscriber:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def push(self, orders: list[tuple]) -> None:
+        # в event loop подписчика; None в очереди - конец потока.
+        # Порог - по уже накопленному: одна большая пачка (/orders/bulk) никого не отключает
+        if self.closed:
+            return
+        if self.queue.qsize() > FEED_QUEUE_LIMIT:
+            self.closed = True
+            self.queue.put_nowait(None)
+            return
+        for order in orders:
+            self.queue.put_nowait(order)
+
+    def deliver(self, orders: list[tuple]) -> None:
+        # из потока-слушателя
+        self.loop.call_soon_threadsafe(self.push, orders)
+
+
+class CallbackSubscriber:
+    # для подписчиков внутри процесса (app/recommendations.py): callback(orders)
+    # вызывается прямо в потоке-слушателе, страницы - по порядку позиций
+    def __init__(self, callback: Callable):
+        self.callback = callback
+
+    def deliver(self, orders: list[tuple]) -> None:
+        self.callback(orders)
+
+
+class OrderFeed:
+    def __init__(self, load: Callable):
+        # load(conn, after) -> [((feed_xid, id), order_json), ...] после позиции after, до FEED_PAGE_SIZE
+        self.load = load
+        self.position: Optional[tuple[int, int]] = None
+        self.reconnects = 0
+        self._subscribers: set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, position: tuple[int, int], sub=None):
+        # из event loop (или с готовым CallbackSubscriber - из любого потока);
+        # position - с какого места подписчик читает сам (догрузка).
+        # Слушатель без подписчиков не читает - первый подписчик задаёт ему позицию
+        sub = sub or Subscriber()
+        with self._lock:
+            if not self._subscribers:
+                self.position = position
+            self._subscribers.add(sub)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="order-feed-listener", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "listening": self._thread is not None and self._thread.is_alive(),
+            "subscribers": len(self._subscribers),
+            "position": format_event_id(self.position) if self.position else None,
+            "reconnects": self.reconnects,
+        }
+
+    # ---------- поток-слушатель ----------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                self.reconnects += 1  # БД перезапустилась и т.п.
+                self._stop.wait(RECONNECT_SECONDS)
+
+    def _listen(self) -> None:
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()  # соединение живёт всё время, в пул не возвращается
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {FEED_CHANNEL}")
+
+            # чтение после LISTEN и по позиции: ни обрыв соединения, ни commit
+            # до LISTEN заказов не теряют
+            while not self._stop.is_set():
+                self._deliver()
+                if select.select([conn], [], [], POLL_SECONDS)[0]:
+                    conn.poll()
+                    conn.notifies.clear()
+        finally:
+            conn.close()
+
+    def _deliver(self) -> None:
+        while True:
+            with self._lock:
+                position = self.position if self._subscribers else None
+            if position is None:
+                return
+            with engine.connect() as conn:
+                orders = self.load(conn, position)
+            if not orders:
+                return
+            # подписчики и позиция - после чтения, под одной блокировкой: подписчик,
+            # пришедший во время load, мог догрузить backlog по более раннему снимку и
+            # получит эту страницу здесь (повторы он отбрасывает сам). Подписчик после
+            # этой точки догружает по более позднему снимку
+            with self._lock:
+                subscribers = list(self._subscribers)
+                if not subscribers:
+                    return
+                if self.position != position:
+                    continue  # позицию задал новый первый подписчик - читаем от неё
+                self.position = orders[-1][0]
+            for sub in subscribers:
+                try:
+                    sub.deliver(orders)
+                except RuntimeError:
+                    self.unsubscribe(sub)  # event loop подписчика уже закрыт
+            if len(orders) < FEED_PAGE_SIZE:
+                return
@@ -0,0 +1,102 @@
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import Float, Integer, String, and_, asc, desc, tuple_
+
+# Курсор = base64(json([sort_by, значение ключа сортировки, id последней строки])).
+# Порядок всегда (sort_col, id), поэтому каждая страница - это range scan
+# по индексу от позиции курсора (для nullable-колонки - максимум два), независимо от глубины.
+
+
+def encode_cursor(sort_by: str, value, last_id: int) -> str:
+    raw = json.dumps([sort_by, value, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_col) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, value, last_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort_by != sort_by or not _is_int(last_id):
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by")
+    # значение уходит в SQL параметром: неподходящий тип - 400, а не DataError
+    if not _matches_column(value, sort_col.expression):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _matches_column(value, column) -> bool:
+    if value is None:
+        return column.nullable
+    if isinstance(column.type, Integer):
+        return _is_int(value)
+    if isinstance(column.type, Float):
+        return _is_int(value) or isinstance(value, float)
+    if isinstance(column.type, String):
+        return isinstance(value, str)
+    return False
+
+
+def keyset_order(q, sort_col, id_col, descending: bool):
+    direction = desc if descending else asc
+    if sort_col is id_col:
+        return q.order_by(direction(id_col))
+    return q.order_by(direction(sort_col), direction(id_col))
+
+
+def after_cursor(sort_col, id_col, descending: bool, value, last_id: int) -> list:
+    # Условия для строк после курсора, по порядку выдачи. Каждое - один range scan
+    # по индексу (sort_col, id): "(col, id) > (...) OR col IS NULL" планировщик
+    # индексным условием не сделает и читает индекс с начала. Поэтому NULL-часть
+    # nullable-колонки - отдельное условие (fetch_after_cursor: запрос на каждое,
+    # пока страница не заполнится). Postgres: ASC -> NULLS LAST, DESC -> NULLS FIRST.
+    if sort_col is id_col:
+        return [id_col < last_id if descending else id_col > last_id]
+    nullable = sort_col.expression.nullable
+
+    if descending:
+        if value is None:
+            return [and_(sort_col.is_(None), id_col < last_id), sort_col.isnot(None)]
+        return [tuple_(sort_col, id_col) < tuple_(value, last_id)]
+
+    if value is None:
+        return [and_(sort_col.is_(None), id_col > last_id)]
+    ranges = [tuple_(sort_col, id_col) > tuple_(value, last_id)]
+    if nullable:
+        ranges.append(sort_col.is_(None))
+    return ranges
+
+
+def fetch_after_cursor(query, ranges: list, limit: int) -> list:
+    # query уже с фильтрами и keyset_order
+    rows = []
+    for condition in ranges:
+        rows += query.filter(condition).limit(limit - len(rows)).all()
+        if len(rows) == limit:
+            break
+    return rows
+
+
+def after_cursor_sql(sort_by: str, descending: bool, value, nullable: bool = False) -> list[str]:
+    # то же самое для raw SQL; параметры :cursor_value и :cursor_id
+    if sort_by == "id":
+        return ["id < :cursor_id" if descending else "id > :cursor_id"]
+
+    if descending:
+        if value is None:
+            return [f"({sort_by} IS NULL AND id < :cursor_id)", f"{sort_by} IS NOT NULL"]
+        return [f"({sort_by}, id) < (:cursor_value, :cursor_id)"]
+
+    if value is None:
+        return [f"({sort_by} IS NULL AND id > :cursor_id)"]
+    ranges = [f"({sort_by}, id) > (:cursor_value, :cursor_id)"]
+    if nullable:
+        ranges.append(f"{sort_by} IS NULL")
+    return ranges
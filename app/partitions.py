@@ -0,0 +1,207 @@
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.db import engine
+from app.versions import ORDERS, bump_version
+
+# orders и order_items секционированы по created_at (RANGE, по месяцу):
+# orders_y2026m01, order_items_y2026m01, ... Партиции по умолчанию нет:
+# строка вне существующих месяцев - ошибка.
+# Партиции создаются только вне запросов: при старте и периодически из lifespan
+# (start_scheduler, PARTITION_MONTHS_AHEAD вперёд), scripts.partitions и сидером.
+# Пути записи (create_order, /orders/bulk) сверяются с _known - месяцами,
+# которые есть у обеих таблиц. Запрос к БД - только при промахе (партицию мог
+# создать scripts.partitions в другом процессе) и не чаще MISS_REFRESH_SECONDS.
+# Новая партиция: CREATE TABLE + ATTACH PARTITION. ATTACH берёт на родителя
+# SHARE UPDATE EXCLUSIVE и не ждёт читателей (длинный стрим /orders/export),
+# в отличие от CREATE TABLE ... PARTITION OF (ACCESS EXCLUSIVE, за которым
+# встали бы и все записи заказов). lock_timeout - чтобы DDL не держал очередь:
+# не успел - повторится при следующей проверке.
+# order_items.created_at = orders.created_at заказа: FK (order_id, created_at)
+# и отсечение партиций в JOIN по обоим полям.
+
+PARTITIONED = ("orders", "order_items")
+PARTITION_NAME = re.compile(r"^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$")
+LOCK_KEY = 7_316_001  # pg_advisory_xact_lock: одна сессия создаёт/отцепляет партиции
+DDL_LOCK_TIMEOUT = "5s"
+RETRY_SECONDS = 30.0  # повтор после ошибки периодической проверки
+MISS_REFRESH_SECONDS = 5.0
+
+_known: set[date] = set()
+_refreshed_at = 0.0  # time.monotonic() последнего перечитывания при промахе
+_lock = threading.Lock()
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def parent_table(name: str) -> str:
+    # orders_y2026m01 -> orders (для отчётов по планам запросов)
+    m = PARTITION_NAME.match(name)
+    return m.group("table") if m else name
+
+
+def naive_utc(value: datetime) -> datetime:
+    # created_at хранится как timestamp without time zone в UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def created_at_range_sql(column: str, date_from: Optional[datetime], date_to: Optional[datetime]):
+    # Условия только для заданных границ: "(:x IS NULL OR created_at >= :x)"
+    # не даёт планировщику отсечь партиции.
+    conditions = ["TRUE"]
+    params = {}
+    if date_from is not None:
+        conditions.append(f"{column} >= :date_from")
+        params["date_from"] = naive_utc(date_from)
+    if date_to is not None:
+        conditions.append(f"{column} < :date_to")
+        params["date_to"] = naive_utc(date_to)
+    return " AND ".join(conditions), params
+
+
+def months_between(start, end) -> list[date]:
+    months = []
+    month = month_start(start)
+    while month <= month_start(end):
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def has_partitions(start, end=None) -> bool:
+    # для путей записи: сначала то, что уже известно процессу
+    months = months_between(start, end or start)
+    with _lock:
+        if all(m in _known for m in months):
+            return True
+    if not _refresh_on_miss():
+        return False
+    with _lock:
+        return all(m in _known for m in months)
+
+
+def _refresh_on_miss() -> bool:
+    global _refreshed_at
+    now = time.monotonic()
+    with _lock:
+        if now - _refreshed_at < MISS_REFRESH_SECONDS:
+            return False  # строки за несуществующий месяц не должны стоить запроса каждая
+        _refreshed_at = now
+    with engine.connect() as conn:
+        _refresh_known(conn)
+    return True
+
+
+def _refresh_known(conn) -> None:
+    attached = [{month for month, _ in list_partitions(conn, table)} for table in PARTITIONED]
+    with _lock:
+        _known.clear()
+        _known.update(set.intersection(*attached))
+
+
+def ensure_partitions(start, end=None) -> list[str]:
+    """Создаёт недостающие месячные партиции для дат из [start, end]. Не из запросов."""
+    months = months_between(start, end or start)
+    created = []
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        conn.execute(text(f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'"))
+        attached = {table: {m for m, _ in list_partitions(conn, table)} for table in PARTITIONED}
+        for month in months:
+            # orders раньше order_items: FK order_items -> orders
+            for table in PARTITIONED:
+                if month in attached[table]:
+                    continue
+                name = partition_name(table, month)
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                ))
+                conn.execute(text(
+                    f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+                ))
+                created.append(name)
+        _refresh_known(conn)
+    return created
+
+
+def ensure_future_partitions(months_ahead: int) -> list[str]:
+    today = datetime.utcnow().date()
+    end = month_start(today)
+    for _ in range(months_ahead):
+        end = next_month(end)
+    return ensure_partitions(today, end)
+
+
+def start_partition_checks(months_ahead: int, interval: float) -> threading.Event:
+    # первая проверка - сразу, но в фоне: старт воркера не ждёт DDL и блокировок
+    # (до неё запись в месяц без известной партиции - 503, см. has_partitions).
+    # Дальше - раз в interval (смена месяца, партиции созданные или отцепленные
+    # scripts.partitions в другом процессе); interval <= 0 - только первая
+    stop = threading.Event()
+
+    def loop():
+        wait = 0
+        while not stop.wait(wait):
+            try:
+                ensure_future_partitions(months_ahead)
+            except Exception:
+                # БД недоступна, lock_timeout и т.п.
+                wait = RETRY_SECONDS if interval <= 0 else min(interval, RETRY_SECONDS)
+                continue
+            if interval <= 0:
+                return
+            wait = interval
+
+    threading.Thread(target=loop, name="partitions", daemon=True).start()
+    return stop
+
+
+def list_partitions(conn, table: str) -> list[tuple[date, str]]:
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:table AS regclass)
+    """), {"table": table}).scalars()
+    found = []
+    for name in rows:
+        m = PARTITION_NAME.match(name)
+        if m and m.group("table") == table:
+            found.append((date(int(m.group("year")), int(m.group("month")), 1), name))
+    return sorted(found)
+
+
+def detach_partitions(before) -> list[str]:
+    """Отцепляет месяцы целиком раньше before; таблицы остаются (архив / DROP вручную)."""
+    before = month_start(before)
+    detached = []
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        # order_items раньше orders: FK order_items -> orders
+        for table in reversed(PARTITIONED):
+            for month, name in list_partitions(conn, table):
+                if month < before:
+                    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    detached.append(name)
+        if detached:
+            bump_version(conn, ORDERS)  # заказы отцепленных месяцев пропали из выборок
+        _refresh_known(conn)
+    return detached
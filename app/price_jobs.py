@@ -0,0 +1,222 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.cache import dish_cache
+from app.config import settings
+from app.db import SessionLocal
+from app.versions import bump_version
+
+# Фоновое повышение цен (POST /analytics/dishes/raise_price_sql?background=true).
+# Вместо одного UPDATE по всем подходящим блюдам - порции по chunk_size в порядке id,
+# каждая в своей короткой транзакции: блокировки строк dishes держатся недолго,
+# заказы и другие записи проходят между порциями. Прогресс (last_id, updated)
+# пишется в price_update_jobs в той же транзакции, что и порция, поэтому после
+# отмены или ошибки видно, какие блюда уже подорожали (id <= last_id).
+# Отмена переводит задачу в cancelled; порция, которая это увидит, откатывается.
+# Задачи выполняет отдельный поток процесса (job_runner, пул price-jobs), не
+# BackgroundTasks: та работает внутри ASGI-вызова запроса, и весь прогон задачи
+# попадал бы в его время и метрики.
+# Если процесс умер или остановился посреди задачи, она остаётся в running без
+# движения updated_at. Через price_job_stale_seconds её забирает проверка
+# job_runner.start_recovery любого процесса и продолжает с last_id (max_id и total
+# остаются от первого старта). Порция засчитывается, только если last_id с её
+# начала не изменился: если прежний исполнитель всё-таки жив, из двух
+# параллельных порций одна откатится, и он остановится.
+
+ACTIVE = ("pending", "running")
+RETRY_SECONDS = 30
+
+# pending, или running без прогресса дольше :stale_seconds
+START = text("""
+    UPDATE price_update_jobs j
+    SET status = 'running',
+        max_id = COALESCE(j.max_id, (SELECT COALESCE(MAX(id), 0) FROM dishes)),
+        total = COALESCE(j.total, (
+          SELECT COUNT(*) FROM dishes
+          WHERE category = j.category AND calories >= j.min_calories
+        )),
+        updated_at = now()
+    WHERE j.id = :job_id
+      AND (j.status = 'pending'
+           OR (j.status = 'running' AND j.updated_at < now() - make_interval(secs => :stale_seconds)))
+    RETURNING j.category, j.min_calories, j.percent, j.chunk_size, j.max_id, j.last_id
+""")
+
+STALE = text("""
+    SELECT id FROM price_update_jobs
+    WHERE status IN ('pending', 'running')
+      AND updated_at < now() - make_interval(secs => :stale_seconds)
+    ORDER BY id
+""")
+
+CHUNK = text("""
+    WITH batch AS (
+      SELECT id FROM dishes
+      WHERE category = :category
+        AND calories >= :min_calories
+        AND id > :last_id AND id <= :max_id
+      ORDER BY id
+      LIMIT :chunk_size
+    )
+    UPDATE dishes d
+    SET price = d.price * :multiplier
+    FROM batch
+    WHERE d.id = batch.id
+    RETURNING d.id
+""")
+
+PROGRESS = text("""
+    UPDATE price_update_jobs
+    SET last_id = :last_id,
+        updated = updated + :updated,
+        status = CASE WHEN :finished THEN 'done' ELSE status END,
+        finished_at = CASE WHEN :finished THEN now() END,
+        updated_at = now()
+    WHERE id = :job_id AND status = 'running' AND last_id = :from_id
+""")
+
+
+def create_job(db: Session, category: str, min_calories: int, percent: float,
+               chunk_size: Optional[int] = None) -> int:
+    return db.execute(
+        text("""
+            INSERT INTO price_update_jobs
+              (category, min_calories, percent, chunk_size, status, last_id, updated)
+            VALUES (:category, :min_calories, :percent, :chunk_size, 'pending', 0, 0)
+            RETURNING id
+        """),
+        {
+            "category": category,
+            "min_calories": min_calories,
+            "percent": percent,
+            "chunk_size": chunk_size or settings.price_job_chunk_size,
+        },
+    ).scalar()
+
+
+def get_job(db: Session, job_id: int) -> Optional[dict]:
+    row = db.execute(text("""
+        SELECT id, category, min_calories, percent, chunk_size, status,
+               last_id, max_id, total, updated, error, created_at, updated_at, finished_at
+        FROM price_update_jobs
+        WHERE id = :job_id
+    """), {"job_id": job_id}).first()
+    return dict(row._mapping) if row else None
+
+
+def cancel_job(db: Session, job_id: int) -> bool:
+    res = db.execute(text("""
+        UPDATE price_update_jobs
+        SET status = 'cancelled', finished_at = now(), updated_at = now()
+        WHERE id = :job_id AND status IN ('pending', 'running')
+    """), {"job_id": job_id})
+    return res.rowcount > 0
+
+
+class JobRunner:
+    # один поток на процесс: задачи процесса выполняются по очереди
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: int) -> None:
+        # после commit задачи
+        with self._lock:
+            if self._executor is None:
+                self._stopping = threading.Event()
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-jobs")
+            self._executor.submit(run_job, job_id, self._stopping)
+
+    def start_recovery(self, stale_seconds: float) -> Optional[threading.Event]:
+        # задачи, брошенные другим (или прошлым этим) процессом; 0 = не подбирать
+        if stale_seconds <= 0:
+            return None
+        stop = threading.Event()
+
+        def loop():
+            wait = 0
+            while not stop.wait(wait):
+                try:
+                    db = SessionLocal()
+                    try:
+                        job_ids = db.execute(STALE, {"stale_seconds": stale_seconds}).scalars().all()
+                    finally:
+                        db.close()
+                    for job_id in job_ids:
+                        self.submit(job_id)  # START отдаст задачу только одному исполнителю
+                    wait = stale_seconds
+                except Exception:
+                    wait = min(stale_seconds, RETRY_SECONDS)
+
+        threading.Thread(target=loop, name="price-jobs-recovery", daemon=True).start()
+        return stop
+
+    def stop(self) -> None:
+        # текущая задача останавливается после порции и остаётся в running до подбора
+        with self._lock:
+            self._stopping.set()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+job_runner = JobRunner()
+
+
+def run_job(job_id: int, stopping: Optional[threading.Event] = None) -> None:
+    db = SessionLocal()
+    try:
+        job = db.execute(START, {"job_id": job_id, "stale_seconds": settings.price_job_stale_seconds}).first()
+        db.commit()
+        if job is None:
+            return  # отменили до старта или уже выполняется
+
+        last_id = job.last_id
+        while stopping is None or not stopping.is_set():
+            ids = db.execute(CHUNK, {
+                "category": job.category,
+                "min_calories": job.min_calories,
+                "last_id": last_id,
+                "max_id": job.max_id,
+                "chunk_size": job.chunk_size,
+                "multiplier": 1.0 + job.percent / 100.0,
+            }).scalars().all()
+
+            finished = len(ids) < job.chunk_size
+            from_id = last_id
+            if ids:
+                last_id = max(ids)
+                bump_version(db, "dishes")
+            progress = db.execute(PROGRESS, {
+                "job_id": job_id, "last_id": last_id, "from_id": from_id,
+                "updated": len(ids), "finished": finished,
+            })
+            if progress.rowcount == 0:
+                db.rollback()  # отменена или её продолжает другой исполнитель
+                return
+            db.commit()
+            if ids:
+                dish_cache.invalidate()
+            if finished:
+                return
+            if settings.price_job_pause_ms:
+                time.sleep(settings.price_job_pause_ms / 1000)
+    except Exception as e:
+        db.rollback()
+        db.execute(
+            text("""
+                UPDATE price_update_jobs
+                SET status = 'failed', error = :error, finished_at = now(), updated_at = now()
+                WHERE id = :job_id AND status = 'running'
+            """),
+            {"job_id": job_id, "error": f"{type(e).__name__}: {e}"[:1000]},
+        )
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import chain, permutations
+from typing import Optional
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import text
+
+from app.config import settings
+from app.db import engine, read_engine
+from app.order_feed import FEED_PAGE_SIZE, CallbackSubscriber, OrderFeed, feed_head
+
+# "Часто заказывают вместе" (GET /dishes/{id}/also_ordered), in-process на воркер.
+# Полная сборка: order_items -> разреженная матрица заказ x блюдо X, матрица
+# совместных покупок C = X^T X (блюдо x блюдо, диагональ обнулена), для каждого
+# блюда заранее считается top-N. Вместе с матрицей читаются имена и цены блюд:
+# эндпоинт отвечает только из памяти, без запросов к БД.
+# Новые заказы всех воркеров приходят из ленты заказов (OrderFeed по
+# LISTEN/NOTIFY, app/order_feed.py): счётчики только растут, поэтому top-N
+# пересчитывается только по изменившимся парам. Заказ, уже попавший в снимок
+# сборки, пропускается (по order_id). Удаления, правки и изменения блюд попадают
+# в матрицу при следующей полной сборке (ALSO_ORDERED_REBUILD_SECONDS).
+# Сборка - только в потоке из lifespan (start_scheduler), никогда в запросе:
+# до первой сборки top() возвращает None, эндпоинт отвечает 503.
+
+FETCH_CHUNK = 100_000
+RETRY_SECONDS = 30.0  # повтор после неудачной сборки
+
+# как FEED_ORDERS в app/routers/orders.py, но вместо JSON заказа - id его блюд
+FEED_ORDER_DISHES = text("""
+    SELECT CAST(o.feed_xid AS text), o.id, ARRAY(
+      SELECT oi.dish_id FROM order_items oi WHERE oi.order_id = o.id AND oi.created_at = o.created_at
+    )
+    FROM orders o
+    WHERE (o.feed_xid, o.id) > (CAST(:xid AS xid8), :order_id)
+      AND o.feed_xid < pg_snapshot_xmin(pg_current_snapshot())
+    ORDER BY o.feed_xid, o.id
+    LIMIT :limit
+""")
+
+
+def _feed_order_dishes(conn, after: tuple[int, int]) -> list:
+    # [((feed_xid, id), (id, [dish_id, ...]))]
+    params = {"xid": str(after[0]), "order_id": after[1], "limit": FEED_PAGE_SIZE}
+    rows = conn.execute(FEED_ORDER_DISHES, params)
+    return [((int(xid), order_id), (order_id, dishes)) for xid, order_id, dishes in rows]
+
+
+class AlsoOrdered:
+    def __init__(self, top_n: int):
+        self.top_n = top_n
+        self.built_at: Optional[datetime] = None
+        self.build_seconds: Optional[float] = None
+        self.dishes: dict[int, dict] = {}  # снимок сборки: dish_id -> {"name", "price"}
+        self._ids = np.empty(0, dtype=np.int64)  # id блюда -> строка/столбец матрицы
+        self._loaded = np.empty(0, dtype=np.int64)  # id заказов в снимке сборки, по возрастанию
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.int64)
+        self._delta: dict[tuple[int, int], int] = defaultdict(int)  # пары после сборки
+        self._top: dict[int, list[tuple[int, int]]] = {}  # dish_id -> [(count, other_id)] по убыванию
+        # заказы из ленты, которых не было в последнем снимке: следующая сборка
+        # (например, с отстающей реплики) может их тоже не увидеть
+        self._recent: list[tuple[int, list[int]]] = []
+        self._feed = OrderFeed(_feed_order_dishes)
+        self._following = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    # ---------- чтение ----------
+
+    def top(self, dish_id: int, limit: int) -> Optional[list[tuple[int, int]]]:
+        if self.built_at is None:
+            return None
+        return self._top.get(dish_id, [])[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "built_at": self.built_at.isoformat() if self.built_at else None,
+            "build_seconds": self.build_seconds,
+            "dishes": len(self._ids),
+            "pairs": int(self._matrix.nnz),
+            "pairs_since_build": len(self._delta),
+            "orders_since_build": len(self._recent),
+            "feed": self._feed.stats(),
+        }
+
+    # ---------- полная сборка ----------
+
+    def _load(self) -> tuple[np.ndarray, np.ndarray, dict]:
+        # один запрос - один снимок; какие заказы в него попали, видно по order_id
+        with read_engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=FETCH_CHUNK).execute(
+                text("SELECT order_id, dish_id FROM order_items")
+            )
+            # fromiter по плоскому потоку значений: np.array(rows) на порядок медленнее
+            chunks = [
+                np.fromiter(chain.from_iterable(part), dtype=np.int64).reshape(-1, 2)
+                for part in result.partitions()
+            ]
+            dishes = {
+                dish_id: {"name": name, "price": price}
+                for dish_id, name, price in conn.execute(text("SELECT id, name, price FROM dishes"))
+            }
+        pairs = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+        return pairs[:, 0], pairs[:, 1], dishes
+
+    def _top_lists(self, ids: np.ndarray, matrix: sparse.csr_matrix) -> dict:
+        top = {}
+        for row in range(matrix.shape[0]):
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            if start == end:
+                continue
+            counts = matrix.data[start:end]
+            others = ids[matrix.indices[start:end]]
+            # (count desc, id asc) - тот же порядок, что у _apply, включая равные счётчики
+            order = np.lexsort((others, -counts))[:self.top_n]
+            top[int(ids[row])] = [(int(c), int(d)) for c, d in zip(counts[order], others[order])]
+        return top
+
+    def _follow(self) -> None:
+        # лента с позиции до первого снимка: всё, что раньше неё, в снимок уже попало.
+        # Позиция - по primary (там пишутся заказы); заказ, который отстающая
+        # реплика в первый снимок не отдала, войдёт в следующую сборку
+        if self._following:
+            return
+        with engine.connect() as conn:
+            position = feed_head(conn)
+        self._feed.subscribe(position, CallbackSubscriber(self._record_orders))
+        self._following = True
+
+    def rebuild(self) -> None:
+        with self._build_lock:
+            started = time.perf_counter()
+            self._follow()
+            order_ids, dish_ids, dishes = self._load()
+
+            loaded, order_idx = np.unique(order_ids, return_inverse=True)
+            ids, dish_idx = np.unique(dish_ids, return_inverse=True)
+            incidence = sparse.csr_matrix(
+                (np.ones(len(order_idx), dtype=np.int64), (order_idx, dish_idx)),
+                shape=(int(order_idx.max()) + 1 if len(order_idx) else 0, len(ids)),
+            )
+            matrix = (incidence.T @ incidence).tocsr()
+            matrix.setdiag(0)
+            matrix.eliminate_zeros()
+            matrix.sort_indices()
+            top = self._top_lists(ids, matrix)
+
+            with self._lock:
+                self._ids, self._matrix, self._top, self._loaded = ids, matrix, top, loaded
+                self.dishes = dishes
+                self._delta = defaultdict(int)
+                # заказы из ленты, которых нет в снимке (пришли во время сборки или
+                # реплика их ещё не видела). Не по MAX(id): id выдаётся до commit,
+                # заказ с меньшим id мог закоммититься после снимка
+                self._recent = [o for o in self._recent if not self._in_snapshot(o[0])]
+                for _, order_dishes in self._recent:
+                    self._apply(order_dishes)
+                self.built_at = datetime.now(timezone.utc)
+                self.build_seconds = round(time.perf_counter() - started, 3)
+
+    # ---------- инкрементальные обновления ----------
+
+    def _in_snapshot(self, order_id: int) -> bool:
+        pos = np.searchsorted(self._loaded, order_id)
+        return pos < len(self._loaded) and self._loaded[pos] == order_id
+
+    def _base_count(self, a: int, b: int) -> int:
+        ia = np.searchsorted(self._ids, a)
+        ib = np.searchsorted(self._ids, b)
+        if ia >= len(self._ids) or ib >= len(self._ids) or self._ids[ia] != a or self._ids[ib] != b:
+            return 0
+        start, end = self._matrix.indptr[ia], self._matrix.indptr[ia + 1]
+        pos = start + np.searchsorted(self._matrix.indices[start:end], ib)
+        if pos < end and self._matrix.indices[pos] == ib:
+            return int(self._matrix.data[pos])
+        return 0
+
+    def _apply(self, dishes: list[int]) -> None:
+        for a, b in permutations(set(dishes), 2):
+            self._delta[(a, b)] += 1
+            count = self._base_count(a, b) + self._delta[(a, b)]
+            entries = [e for e in self._top.get(a, []) if e[1] != b]
+            entries.append((count, b))
+            entries.sort(key=lambda e: (-e[0], e[1]))
+            self._top[a] = entries[:self.top_n]
+
+    def _record_orders(self, page: list[tuple]) -> None:
+        # из потока ленты; page: [(позиция, (order_id, [dish_id, ...])), ...]
+        with self._lock:
+            for _, (order_id, dishes) in page:
+                if self._in_snapshot(order_id):
+                    continue  # лента отстаёт от снимка - уже посчитан
+                self._recent.append((order_id, dishes))
+                if self.built_at is not None:
+                    self._apply(dishes)
+
+    # ---------- плановая пересборка ----------
+
+    def start_scheduler(self, interval: float) -> threading.Event:
+        # первая сборка - всегда; interval <= 0 - только она
+        stop = threading.Event()
+
+        def loop():
+            while not stop.is_set():
+                try:
+                    self.rebuild()
+                except Exception:
+                    stop.wait(RETRY_SECONDS)  # БД недоступна и т.п.
+                    continue
+                if interval <= 0:
+                    return
+                stop.wait(interval)
+
+        threading.Thread(target=loop, name="also-ordered-rebuild", daemon=True).start()
+        return stop
+
+    def stop(self) -> None:
+        self._feed.stop()
+
+
+also_ordered = AlsoOrdered(top_n=settings.also_ordered_top_n)
@@ -0,0 +1,53 @@
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Optional, get_args
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.config import settings
+
+
+# Готовый JSON (например, собранный в Postgres через json_agg) без повторной сериализации.
+def json_response(body, response: Optional[Response] = None) -> Response:
+    # заголовки, выставленные на Depends-Response (X-Next-Cursor, ETag), иначе теряются
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Быстрый путь (FAST_JSON=1): данные из БД не валидируются через response_model,
+# а сразу кодируются orjson. Поля берутся из схемы app/schemas.py, так что состав
+# ответа тот же; схемы должны быть плоскими (без вложенных моделей).
+def _has_model(annotation) -> bool:
+    # Model, Optional[Model], list[Model], ...
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    return any(_has_model(arg) for arg in get_args(annotation))
+
+
+@lru_cache
+def _serializer(model: type[BaseModel], from_dict: bool):
+    names = tuple(model.model_fields)
+    for name, field in model.model_fields.items():
+        # проверка при первом вызове для схемы, не assert: под python -O его бы не было
+        if _has_model(field.annotation):
+            raise TypeError(f"fast_json: {model.__name__}.{name} is a nested model, use response_model")
+    getter = itemgetter(*names) if from_dict else attrgetter(*names)
+    if len(names) == 1:
+        return lambda obj: {names[0]: getter(obj)}  # с одним именем getter отдаёт значение, не кортеж
+    return lambda obj: dict(zip(names, getter(obj)))
+
+
+def fast_json(data, response: Optional[Response] = None, model: Optional[type[BaseModel]] = None):
+    if not settings.fast_json:
+        return data
+
+    if model is not None:
+        many = isinstance(data, list)
+        items = data if many else [data]
+        if items:
+            serialize = _serializer(model, isinstance(items[0], dict))
+            items = [serialize(obj) for obj in items]
+        data = items if many else items[0]
+    return json_response(orjson.dumps(data), response)
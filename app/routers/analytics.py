@@ -1,84 +1,152 @@
+from datetime import date, datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import Float, Integer, String, bindparam, text
 
-from app.db import get_db
+from app.cache import dish_cache
+from app.db import get_db, get_read_db, set_write_lsn
+from app.dish_meta import meta_filter_sql
+from app.models import Dish
+from app.pagination import after_cursor_sql, decode_cursor, encode_cursor
+from app.partitions import created_at_range_sql
+from app.price_jobs import cancel_job, create_job, get_job, job_runner
+from app.responses import fast_json, json_response
+from app.versions import DAILY_REVENUE, ORDERS, bump_version, check_not_modified
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
 @router.get("/dishes/filter_sql")
 def dishes_filter_sql(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_calories: Optional[int] = None,
     category: Optional[str] = None,
+    tag: Optional[list[str]] = Query(None),
+    min_rating: Optional[float] = None,
+    meta_contains: Optional[str] = None,
     sort_by: str = Query("id"),
     sort_dir: str = Query("asc"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
 ):
+    check_not_modified(request, response, db, "dishes")
+    meta_conditions, meta_params = meta_filter_sql(tag, min_rating, meta_contains)
+
     allowed_sort = {"id", "price", "name", "calories"}
     if sort_by not in allowed_sort:
         sort_by = "id"
     sort_dir = "desc" if sort_dir.lower() == "desc" else "asc"
 
-    sql = text(f"""
+    params = {
+        "min_price": min_price,
+        "max_price": max_price,
+        "min_calories": min_calories,
+        "category": category,
+        "offset": offset,
+        **meta_params,
+    }
+    keysets = ["TRUE"]
+    meta_filter = " AND ".join(meta_conditions) or "TRUE"
+    if cursor:
+        sort_col = Dish.__table__.c[sort_by]
+        value, last_id = decode_cursor(cursor, sort_by, sort_col)
+        keysets = after_cursor_sql(sort_by, sort_dir == "desc", value, sort_col.nullable)
+        params.update(cursor_value=value, cursor_id=last_id, offset=0)
+
+    order_by = "id" if sort_by == "id" else f"{sort_by} {sort_dir}, id"
+
+    # после курсора по nullable-колонке - до двух диапазонов индекса, запрос на каждый
+    rows = []
+    for keyset in keysets:
+        rows += db.execute(_filter_sql(order_by, sort_dir, meta_filter, keyset), {
+            **params, "limit": limit - len(rows),
+        }).fetchall()
+        if len(rows) == limit:
+            break
+
+    if len(rows) == limit:
+        last = rows[-1]._mapping
+        response.headers["X-Next-Cursor"] = encode_cursor(sort_by, last[sort_by], last["id"])
+    return fast_json([dict(r._mapping) for r in rows], response)
+
+
+def _filter_sql(order_by: str, sort_dir: str, meta_filter: str, keyset: str):
+    return text(f"""
         SELECT id, name, price, calories, portion_grams, category, meta
         FROM dishes
         WHERE (:min_price IS NULL OR price >= :min_price)
           AND (:max_price IS NULL OR price <= :max_price)
           AND (:min_calories IS NULL OR calories >= :min_calories)
           AND (:category IS NULL OR category = :category)
-        ORDER BY {sort_by} {sort_dir}
+          AND {meta_filter}
+          AND {keyset}
+        ORDER BY {order_by} {sort_dir}
         LIMIT :limit OFFSET :offset
-    """)
+    """).bindparams(
+        # типы нужны asyncpg для ":x IS NULL"
+        bindparam("min_price", type_=Float),
+        bindparam("max_price", type_=Float),
+        bindparam("min_calories", type_=Integer),
+        bindparam("category", type_=String),
+    )
 
-    rows = db.execute(
-        sql,
-        {
-            "min_price": min_price,
-            "max_price": max_price,
-            "min_calories": min_calories,
-            "category": category,
-            "limit": limit,
-            "offset": offset,
-        },
-    ).fetchall()
 
-    return [dict(r._mapping) for r in rows]
+@router.get("/clients/{client_id}/orders_sql")
+def client_orders_sql(
+    client_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    check_not_modified(request, response, db, "clients", ORDERS)
 
+    # date_from/date_to ограничивают партиции orders, которые читает запрос
+    date_range, params = created_at_range_sql("o.created_at", date_from, date_to)
 
-@router.get("/clients/{client_id}/orders_sql")
-def client_orders_sql(client_id: int, db: Session = Depends(get_db)):
-    sql = text("""
+    # orders.total фиксируется при создании заказа
+    sql = text(f"""
         SELECT
           o.id AS order_id,
           o.created_at,
           o.payment_type,
-          SUM(d.price * oi.quantity) AS total_sum
+          o.total AS total_sum
         FROM orders o
-        JOIN order_items oi ON oi.order_id = o.id
-        JOIN dishes d ON d.id = oi.dish_id
         WHERE o.client_id = :client_id
-        GROUP BY o.id, o.created_at, o.payment_type
+          AND {date_range}
         ORDER BY o.id DESC
     """)
 
-    rows = db.execute(sql, {"client_id": client_id}).fetchall()
-    return [dict(r._mapping) for r in rows]
+    rows = db.execute(sql, {"client_id": client_id, **params}).fetchall()
+    return fast_json([dict(r._mapping) for r in rows], response)
 
 
 @router.post("/dishes/raise_price_sql")
 def raise_price_sql(
+    response: Response,
     category: str = Query(...),
     min_calories: int = Query(0),
     percent: float = Query(10.0),
+    background: bool = Query(False),
+    chunk_size: Optional[int] = Query(None, ge=1, le=10000),
     db: Session = Depends(get_db),
 ):
+    if background:
+        # порциями в фоне (app/price_jobs.py); прогресс - GET /analytics/price_jobs/{id}
+        job_id = create_job(db, category, min_calories, percent, chunk_size)
+        db.commit()
+        job_runner.submit(job_id)
+        response.status_code = 202
+        return get_job(db, job_id)
+
     multiplier = 1.0 + percent / 100.0
 
     sql = text("""
@@ -96,79 +164,171 @@ def raise_price_sql(
             "min_calories": min_calories,
         },
     )
+    bump_version(db, "dishes")
     db.commit()
+    dish_cache.invalidate()
+    set_write_lsn(db, response)
     return {"updated": res.rowcount, "category": category, "percent": percent}
 
 
+@router.get("/price_jobs/{job_id}")
+def price_job_status(job_id: int, db: Session = Depends(get_db)):
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/price_jobs/{job_id}/cancel")
+def cancel_price_job(job_id: int, db: Session = Depends(get_db)):
+    cancelled = cancel_job(db, job_id)
+    db.commit()
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not cancelled:
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+    return job
+
+
 @router.get("/top_clients_by_spend_sql")
 def top_clients_by_spend_sql(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     limit: int = Query(10, ge=1, le=100),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
 ):
+    check_not_modified(request, response, db, "clients", ORDERS)
+
+    if date_from is not None or date_to is not None:
+        # за период: сумма по заказам, читаются только партиции периода
+        date_range, params = created_at_range_sql("o.created_at", date_from, date_to)
+        sql = text(f"""
+            SELECT
+              o.client_id,
+              c.full_name,
+              SUM(o.total) AS total_spend
+            FROM orders o
+            JOIN clients c ON c.id = o.client_id
+            WHERE {date_range}
+            GROUP BY o.client_id, c.full_name
+            ORDER BY total_spend DESC
+            LIMIT :limit
+        """)
+        rows = db.execute(sql, {"limit": limit, **params}).fetchall()
+        return fast_json([dict(r._mapping) for r in rows], response)
+
+    # за всё время: client_spend поддерживается при записи заказов -> top-N по индексу
     sql = text("""
         SELECT
-          c.id AS client_id,
+          cs.client_id,
           c.full_name,
-          SUM(d.price * oi.quantity) AS total_spend
-        FROM clients c
-        JOIN orders o ON o.client_id = c.id
-        JOIN order_items oi ON oi.order_id = o.id
-        JOIN dishes d ON d.id = oi.dish_id
-        GROUP BY c.id, c.full_name
-        ORDER BY total_spend DESC
+          cs.total_spend
+        FROM client_spend cs
+        JOIN clients c ON c.id = cs.client_id
+        ORDER BY cs.total_spend DESC
         LIMIT :limit
     """)
 
     rows = db.execute(sql, {"limit": limit}).fetchall()
-    return [dict(r._mapping) for r in rows]
+    return fast_json([dict(r._mapping) for r in rows], response)
+
+# group_by -> выражение над daily_revenue
+REVENUE_GROUPS = {
+    "day": "day",
+    "week": "CAST(date_trunc('week', day) AS date)",
+    "month": "CAST(date_trunc('month', day) AS date)",
+    "category": "NULLIF(category, '')",
+    "payment_type": "NULLIF(payment_type, '')",
+}
+
+
+@router.get("/revenue")
+def revenue(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    group_by: str = Query("day", description="comma-separated: day|week|month, category, payment_type"),
+    category: Optional[str] = None,
+    payment_type: Optional[str] = None,
+):
+    check_not_modified(request, response, db, ORDERS, DAILY_REVENUE)
+
+    groups = [g.strip() for g in group_by.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in REVENUE_GROUPS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {unknown[0]}")
+    if len({"day", "week", "month"} & set(groups)) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of day, week, month")
+    groups = list(dict.fromkeys(groups))
+
+    # daily_revenue + ещё не перенесённые дельты из daily_revenue_log (app/aggregates.py):
+    # запрос читает только строки периода
+    conditions = ["TRUE"]
+    params = {}
+    for name, op, value in (
+        ("date_from", ">=", date_from),
+        ("date_to", "<=", date_to),
+    ):
+        if value is not None:
+            conditions.append(f"day {op} :{name}")
+            params[name] = value
+    for name, value in (("category", category), ("payment_type", payment_type)):
+        if value is not None:
+            conditions.append(f"{name} = :{name}")
+            params[name] = value
+
+    columns = [f"{REVENUE_GROUPS[g]} AS {g}" for g in groups]
+    positions = ", ".join(str(i) for i in range(1, len(groups) + 1))
+    sql = f"""
+        SELECT {"".join(c + ", " for c in columns)}SUM(revenue) AS revenue, SUM(quantity) AS quantity
+        FROM (
+          SELECT day, category, payment_type, revenue, quantity FROM daily_revenue
+          UNION ALL
+          SELECT day, category, payment_type, revenue, quantity FROM daily_revenue_log
+        ) r
+        WHERE {" AND ".join(conditions)}
+    """
+    if groups:
+        sql += f" GROUP BY {positions} ORDER BY {positions}"
+
+    rows = db.execute(text(sql), params).fetchall()
+    return fast_json([dict(r._mapping) for r in rows if r.revenue is not None], response)
+
 
 @router.get("/orders/{order_id}/full_sql")
-def order_full_sql(order_id: int, db: Session = Depends(get_db)):
-    sql = text("""
-        SELECT
-          o.id AS order_id,
-          o.created_at,
-          o.payment_type,
-          c.id AS client_id,
-          c.full_name,
-          oi.dish_id,
-          d.name AS dish_name,
-          d.price AS dish_price,
-          oi.quantity,
-          (d.price * oi.quantity) AS line_sum
+def order_full_sql(order_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    # имена блюд берутся из dishes
+    check_not_modified(request, response, db, "dishes", "clients", ORDERS)
+
+    body = db.execute(text("""
+        SELECT json_build_object(
+          'order_id', o.id,
+          'created_at', o.created_at::text,
+          'payment_type', o.payment_type,
+          'client', json_build_object('client_id', c.id, 'full_name', c.full_name),
+          'items', (
+            SELECT json_agg(json_build_object(
+              'dish_id', oi.dish_id,
+              'dish_name', d.name,
+              'dish_price', oi.unit_price,
+              'quantity', oi.quantity,
+              'line_sum', oi.unit_price * oi.quantity
+            ) ORDER BY oi.dish_id)
+            FROM order_items oi
+            JOIN dishes d ON d.id = oi.dish_id
+            WHERE oi.order_id = o.id AND oi.created_at = o.created_at
+          ),
+          'total_sum', o.total
+        )::text
         FROM orders o
         JOIN clients c ON c.id = o.client_id
-        JOIN order_items oi ON oi.order_id = o.id
-        JOIN dishes d ON d.id = oi.dish_id
         WHERE o.id = :order_id
-        ORDER BY oi.dish_id
-    """)
-
-    rows = db.execute(sql, {"order_id": order_id}).fetchall()
-    if not rows:
+    """), {"order_id": order_id}).scalar()
+    if body is None:
         return {"detail": "Order not found"}
-
-    items = []
-    total = 0.0
-    for r in rows:
-        m = dict(r._mapping)
-        items.append(
-            {
-                "dish_id": m["dish_id"],
-                "dish_name": m["dish_name"],
-                "dish_price": float(m["dish_price"]) if m["dish_price"] is not None else 0.0,
-                "quantity": m["quantity"],
-                "line_sum": float(m["line_sum"]) if m["line_sum"] is not None else 0.0,
-            }
-        )
-        total += float(m["line_sum"]) if m["line_sum"] is not None else 0.0
-
-    first = dict(rows[0]._mapping)
-    return {
-        "order_id": first["order_id"],
-        "created_at": str(first["created_at"]),
-        "payment_type": first["payment_type"],
-        "client": {"client_id": first["client_id"], "full_name": first["full_name"]},
-        "items": items,
-        "total_sum": total,
-        }
+    return json_response(body, response)
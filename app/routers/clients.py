@@ -1,59 +1,109 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
 
-from app.db import get_db
+from app.bulk import bulk_rows, upsert_rows, upsert_summary
+from app.db import get_db, get_read_db, set_write_lsn
 from app.models import Client
-from app.schemas import ClientCreate, ClientUpdate, ClientOut
+from app.pagination import after_cursor, decode_cursor, encode_cursor, fetch_after_cursor, keyset_order
+from app.responses import fast_json
+from app.schemas import BulkUpsertOut, ClientBulkUpsert, ClientCreate, ClientUpdate, ClientOut
+from app.search import search_rows
+from app.versions import bump_version, check_not_modified
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
 
 @router.post("", response_model=ClientOut)
-def create_client(payload: ClientCreate, db: Session = Depends(get_db)):
+def create_client(payload: ClientCreate, response: Response, db: Session = Depends(get_db)):
     client = Client(**payload.model_dump())
     db.add(client)
+    bump_version(db, "clients")
     db.commit()
     db.refresh(client)
+    set_write_lsn(db, response)
     return client
 
 
+@router.put("/bulk", response_model=BulkUpsertOut)
+def upsert_clients_bulk(
+    response: Response,
+    rows: tuple = Depends(bulk_rows(ClientBulkUpsert)),
+    db: Session = Depends(get_db),
+):
+    valid, results = rows
+    results += upsert_rows(db, Client, valid)
+    bump_version(db, "clients")
+    db.commit()
+    set_write_lsn(db, response)
+    return upsert_summary(results)
+
+
 @router.get("", response_model=list[ClientOut])
 def list_clients(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     sort_by: str = Query("id"),
     sort_dir: str = Query("asc"),
     organization: Optional[str] = None,
     min_age: Optional[int] = None,
+    q: Optional[str] = Query(None, max_length=100),
 ):
-    q = db.query(Client)
+    q = q.strip() if q else None
+    if q and cursor:
+        raise HTTPException(status_code=400, detail="cursor is not supported with q")
+    check_not_modified(request, response, db, "clients")
+
+    query = db.query(Client)
 
     if organization is not None:
-        q = q.filter(Client.organization == organization)
+        query = query.filter(Client.organization == organization)
     if min_age is not None:
-        q = q.filter(Client.age >= min_age)
+        query = query.filter(Client.age >= min_age)
 
     allowed = {"id": Client.id, "full_name": Client.full_name, "age": Client.age}
-    sort_col = allowed.get(sort_by, Client.id)
-    q = q.order_by(desc(sort_col) if sort_dir.lower() == "desc" else asc(sort_col))
-
-    return q.offset(offset).limit(limit).all()
+    if sort_by not in allowed:
+        sort_by = "id"
+    sort_col = allowed[sort_by]
+    descending = sort_dir.lower() == "desc"
+
+    if q:
+        # поиск: префикс по btree, на первой странице добор нечётким (app/search.py)
+        clients = search_rows(query, Client.full_name, Client.id, q, offset, limit)
+    else:
+        query = keyset_order(query, sort_col, Client.id, descending)
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort_by, sort_col)
+            clients = fetch_after_cursor(
+                query, after_cursor(sort_col, Client.id, descending, value, last_id), limit
+            )
+        else:
+            clients = query.offset(offset).limit(limit).all()
+
+    if len(clients) == limit and not q:
+        last = clients[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(sort_by, getattr(last, sort_by), last.id)
+    return fast_json(clients, response, ClientOut)
 
 
 @router.get("/{client_id}", response_model=ClientOut)
-def get_client(client_id: int, db: Session = Depends(get_db)):
+def get_client(client_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    check_not_modified(request, response, db, "clients")
     client = db.query(Client).filter(Client.id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
-    return client
+    return fast_json(client, response, ClientOut)
 
 
 @router.patch("/{client_id}", response_model=ClientOut)
-def update_client(client_id: int, payload: ClientUpdate, db: Session = Depends(get_db)):
+def update_client(
+    client_id: int, payload: ClientUpdate, response: Response, db: Session = Depends(get_db)
+):
     client = db.query(Client).filter(Client.id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
@@ -62,16 +112,20 @@ def update_client(client_id: int, payload: ClientUpdate, db: Session = Depends(g
     for k, v in data.items():
         setattr(client, k, v)
 
+    bump_version(db, "clients")
     db.commit()
     db.refresh(client)
+    set_write_lsn(db, response)
     return client
 
 
 @router.delete("/{client_id}")
-def delete_client(client_id: int, db: Session = Depends(get_db)):
+def delete_client(client_id: int, response: Response, db: Session = Depends(get_db)):
     client = db.query(Client).filter(Client.id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     db.delete(client)
+    bump_version(db, "clients")
     db.commit()
+    set_write_lsn(db, response)
     return {"deleted": True, "id": client_id}
@@ -1,64 +1,156 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
 
-from app.db import get_db
+from app.bulk import bulk_rows, upsert_rows, upsert_summary
+from app.cache import dish_cache, dish_to_dict
+from app.db import get_db, set_write_lsn
+from app.dish_meta import meta_filter_sql
 from app.models import Dish
-from app.schemas import DishCreate, DishUpdate, DishOut
+from app.pagination import after_cursor, decode_cursor, encode_cursor, fetch_after_cursor, keyset_order
+from app.recommendations import also_ordered
+from app.responses import fast_json
+from app.schemas import BulkUpsertOut, DishBulkUpsert, DishCreate, DishUpdate, DishOut
+from app.search import search_rows
+from app.versions import bump_version, check_not_modified
 
 router = APIRouter(prefix="/dishes", tags=["dishes"])
 
 
 @router.post("", response_model=DishOut)
-def create_dish(payload: DishCreate, db: Session = Depends(get_db)):
+def create_dish(payload: DishCreate, response: Response, db: Session = Depends(get_db)):
     dish = Dish(**payload.model_dump())
     db.add(dish)
+    bump_version(db, "dishes")
     db.commit()
     db.refresh(dish)
+    dish_cache.invalidate(dish)
+    set_write_lsn(db, response)
     return dish
 
 
+@router.put("/bulk", response_model=BulkUpsertOut)
+def upsert_dishes_bulk(
+    response: Response,
+    rows: tuple = Depends(bulk_rows(DishBulkUpsert)),
+    db: Session = Depends(get_db),
+):
+    valid, results = rows
+    results += upsert_rows(db, Dish, valid)
+    bump_version(db, "dishes")
+    db.commit()
+    dish_cache.invalidate()
+    set_write_lsn(db, response)
+    return upsert_summary(results)
+
+
+# Чтения блюд идут в primary, а не в реплику: они заполняют dish_cache, и
+# отстающая реплика вернула бы в кэш версию блюда до только что сделанной записи.
 @router.get("", response_model=list[DishOut])
 def list_dishes(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     sort_by: str = Query("id"),
     sort_dir: str = Query("asc"),
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     category: Optional[str] = None,
+    tag: Optional[list[str]] = Query(None),
+    min_rating: Optional[float] = None,
+    meta_contains: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=100),
 ):
-    q = db.query(Dish)
+    q = q.strip() if q else None
+    if q and cursor:
+        raise HTTPException(status_code=400, detail="cursor is not supported with q")
+    versions = check_not_modified(request, response, db, "dishes")
+    meta_conditions, meta_params = meta_filter_sql(tag, min_rating, meta_contains)
 
- 
-    if min_price is not None:
-        q = q.filter(Dish.price >= min_price)
-    if max_price is not None:
-        q = q.filter(Dish.price <= max_price)
-    if category is not None:
-        q = q.filter(Dish.category == category)
-
-   
     allowed = {"id": Dish.id, "price": Dish.price, "name": Dish.name, "calories": Dish.calories}
-    sort_col = allowed.get(sort_by, Dish.id)
-    q = q.order_by(desc(sort_col) if sort_dir.lower() == "desc" else asc(sort_col))
-
-    return q.offset(offset).limit(limit).all()
+    if sort_by not in allowed:
+        sort_by = "id"
+    sort_col = allowed[sort_by]
+    descending = sort_dir.lower() == "desc"
+
+    def load():
+        query = db.query(Dish)
+        if min_price is not None:
+            query = query.filter(Dish.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Dish.price <= max_price)
+        if category is not None:
+            query = query.filter(Dish.category == category)
+        for condition in meta_conditions:
+            query = query.filter(text(condition))
+        if meta_params:
+            query = query.params(**meta_params)
+
+        if q:
+            # поиск: префикс по btree, на первой странице добор нечётким (app/search.py)
+            rows = search_rows(query, Dish.name, Dish.id, q, offset, limit)
+        else:
+            query = keyset_order(query, sort_col, Dish.id, descending)
+            if cursor:
+                value, last_id = decode_cursor(cursor, sort_by, sort_col)
+                rows = fetch_after_cursor(
+                    query, after_cursor(sort_col, Dish.id, descending, value, last_id), limit
+                )
+            else:
+                rows = query.offset(offset).limit(limit).all()
+
+        dishes = [dish_to_dict(d) for d in rows]
+        next_cursor = None
+        if len(dishes) == limit and not q:
+            last = dishes[-1]
+            next_cursor = encode_cursor(sort_by, last[sort_by], last["id"])
+        return dishes, next_cursor
+
+    key = (
+        limit, offset, cursor, sort_by, descending, min_price, max_price, category,
+        tuple(meta_conditions), tuple(sorted(meta_params.items())), q,
+    )
+    dishes, next_cursor = dish_cache.get_list(key, load, versions["dishes"])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return fast_json(dishes, response, DishOut)
 
 
 @router.get("/{dish_id}", response_model=DishOut)
-def get_dish(dish_id: int, db: Session = Depends(get_db)):
-    dish = db.query(Dish).filter(Dish.id == dish_id).first()
+def get_dish(dish_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    versions = check_not_modified(request, response, db, "dishes")
+    dish = dish_cache.get_dish(db, dish_id, versions["dishes"])
     if not dish:
         raise HTTPException(status_code=404, detail="Dish not found")
-    return dish
+    return fast_json(dish, response, DishOut)
+
+
+@router.get("/{dish_id}/also_ordered")
+def also_ordered_dishes(dish_id: int, limit: int = Query(10, ge=1, le=200)):
+    # из памяти воркера (app/recommendations.py), без запросов к БД; имена и цены -
+    # из снимка последней сборки
+    top = also_ordered.top(dish_id, limit)
+    if top is None:
+        raise HTTPException(
+            status_code=503, detail="Recommendations are being built", headers={"Retry-After": "5"}
+        )
+    dishes = also_ordered.dishes
+    if dish_id not in dishes:
+        raise HTTPException(status_code=404, detail="Dish not found")
+    return [
+        {"dish_id": other, "name": dishes[other]["name"], "price": dishes[other]["price"], "count": count}
+        for count, other in top
+        if other in dishes
+    ]
 
 
 @router.patch("/{dish_id}", response_model=DishOut)
-def update_dish(dish_id: int, payload: DishUpdate, db: Session = Depends(get_db)):
+def update_dish(dish_id: int, payload: DishUpdate, response: Response, db: Session = Depends(get_db)):
     dish = db.query(Dish).filter(Dish.id == dish_id).first()
     if not dish:
         raise HTTPException(status_code=404, detail="Dish not found")
@@ -67,16 +159,22 @@ def update_dish(dish_id: int, payload: DishUpdate, db: Session = Depends(get_db)
     for k, v in data.items():
         setattr(dish, k, v)
 
+    bump_version(db, "dishes")
     db.commit()
     db.refresh(dish)
+    dish_cache.invalidate(dish)
+    set_write_lsn(db, response)
     return dish
 
 
 @router.delete("/{dish_id}")
-def delete_dish(dish_id: int, db: Session = Depends(get_db)):
+def delete_dish(dish_id: int, response: Response, db: Session = Depends(get_db)):
     dish = db.query(Dish).filter(Dish.id == dish_id).first()
     if not dish:
         raise HTTPException(status_code=404, detail="Dish not found")
     db.delete(dish)
+    bump_version(db, "dishes")
     db.commit()
+    dish_cache.invalidate()
+    set_write_lsn(db, response)
     return {"deleted": True, "id": dish_id}
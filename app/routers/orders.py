@@ -1,67 +1,515 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Optional
 
-from app.db import get_db
-from app.models import Order, OrderItem, Client, Dish
-from app.schemas import OrderCreate, OrderOut
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.aggregates import record_client_spend, record_daily_revenue
+from app.bulk import BULK_BATCH_SIZE, bulk_rows, rejected
+from app.cache import dish_cache
+from app.db import engine, get_db, get_read_db, read_engine, set_write_lsn
+from app.models import Order, OrderItem
+from app.order_feed import (
+    FEED_CHANNEL, FEED_PAGE_SIZE, OrderFeed, feed_head, format_event_id, notify_orders, parse_event_id,
+)
+from app.pagination import after_cursor_sql, decode_cursor, encode_cursor
+from app.partitions import has_partitions, naive_utc
+from app.responses import json_response
+from app.schemas import OrderCreate, OrderOut, OrderBulkCreate, BulkOrderOut
+from app.versions import BUMP_SQL, ORDERS, bump_version
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+EXPORT_CHUNK_SIZE = 2000
 
-@router.post("", response_model=OrderOut)
-def create_order(payload: OrderCreate, db: Session = Depends(get_db)):
-    # проверим клиента
-    client = db.query(Client).filter(Client.id == payload.client_id).first()
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
+# /orders/feed: пинг для прокси и пауза перед переподключением
+FEED_PING_SECONDS = 15
+FEED_RETRY_MS = 2000
+
+EXPORT_CSV_COLUMNS = [
+    "order_id", "client_id", "created_at", "payment_type", "total",
+    "dish_id", "quantity", "unit_price",
+]
+
+
+def _lookup_refs(db: Session, client_ids: set, dish_ids: set) -> tuple[set, dict]:
+    # клиенты - один set-based запрос, блюда - из кэша каталога
+    sql = text("SELECT id FROM clients WHERE id = ANY(:client_ids)")
+    clients = set(db.execute(sql, {"client_ids": list(client_ids)}).scalars())
+
+    return clients, dish_cache.get_dishes(db, dish_ids)
+
+
+# Заказ, его позиции и агрегаты одним запросом. Клиент проверяется тем же
+# INSERT ... SELECT: нет клиента - нет строки в new_order, и ни позиции, ни
+# агрегаты не пишутся. Цены и категории блюд - из dish_cache, как в /orders/bulk.
+# versions - версия orders для ETag: upsert из bump_version (app/versions.py), tables = [orders].
+# spend и revenue - то же, что record_client_spend и record_daily_revenue (app/aggregates.py).
+# spend ссылается на versions: строка версии блокируется раньше строки client_spend,
+# в том же порядке, что и в /orders/bulk.
+# pg_notify - для /orders/feed, уходит подписчикам при commit.
+CREATE_ORDER = text(f"""
+    WITH versions AS (
+      {BUMP_SQL}
+      RETURNING 1
+    ),
+    new_order AS (
+      INSERT INTO orders (client_id, created_at, payment_type, total)
+      SELECT c.id, CAST(:created_at AS timestamp), CAST(:payment_type AS varchar), CAST(:total AS float8)
+      FROM clients c
+      WHERE c.id = :client_id
+      RETURNING id, client_id, total
+    ),
+    new_items AS (
+      INSERT INTO order_items (order_id, dish_id, created_at, quantity, unit_price, category)
+      SELECT o.id, i.dish_id, CAST(:created_at AS timestamp), i.quantity, i.unit_price, i.category
+      FROM new_order o
+      CROSS JOIN unnest(
+        CAST(:dish_ids AS integer[]), CAST(:quantities AS integer[]), CAST(:prices AS float8[]),
+        CAST(:categories AS varchar[])
+      ) AS i(dish_id, quantity, unit_price, category)
+      RETURNING quantity, unit_price, category
+    ),
+    spend AS (
+      INSERT INTO client_spend (client_id, total_spend, orders_count)
+      SELECT o.client_id, o.total, 1
+      FROM new_order o
+      WHERE EXISTS (SELECT FROM versions)
+      ON CONFLICT (client_id) DO UPDATE
+      SET total_spend = client_spend.total_spend + excluded.total_spend,
+          orders_count = client_spend.orders_count + excluded.orders_count
+    ),
+    revenue AS (
+      INSERT INTO daily_revenue_log (day, category, payment_type, revenue, quantity)
+      SELECT CAST(CAST(:created_at AS timestamp) AS date), COALESCE(i.category, ''),
+             COALESCE(CAST(:payment_type AS varchar), ''), SUM(i.unit_price * i.quantity), SUM(i.quantity)
+      FROM new_items i
+      GROUP BY 1, 2, 3
+    )
+    SELECT id, pg_notify('{FEED_CHANNEL}', '') FROM new_order
+""")
+
+
+def _constraint_name(e: IntegrityError) -> str:
+    # psycopg2: diag; asyncpg (DB_ASYNC=1): исходное исключение - в __cause__
+    diag = getattr(e.orig, "diag", None)
+    if diag is not None:
+        return diag.constraint_name or ""
+    return getattr(e.orig.__cause__, "constraint_name", None) or ""
 
+
+@router.post("", response_model=OrderOut)
+def create_order(payload: OrderCreate, response: Response, db: Session = Depends(get_db)):
     if not payload.items:
         raise HTTPException(status_code=400, detail="Order must have items")
+    dish_ids = [item.dish_id for item in payload.items]
+    if len(dish_ids) != len(set(dish_ids)):
+        raise HTTPException(status_code=400, detail="Duplicate dish_id in order")
 
-  
-    order = Order(client_id=payload.client_id, payment_type=payload.payment_type)
-    db.add(order)
-    db.flush()  # получаем order.id без commit
+    dishes = dish_cache.get_dishes(db, dish_ids)
+    for dish_id in dish_ids:
+        if dish_id not in dishes:
+            raise HTTPException(status_code=404, detail=f"Dish not found: {dish_id}")
 
-    for item in payload.items:
-        dish = db.query(Dish).filter(Dish.id == item.dish_id).first()
-        if not dish:
-            raise HTTPException(status_code=404, detail=f"Dish not found: {item.dish_id}")
+    items = [
+        {
+            "dish_id": item.dish_id,
+            "dish_name": dishes[item.dish_id]["name"],
+            "quantity": item.quantity,
+            "unit_price": dishes[item.dish_id]["price"],
+            "line_total": dishes[item.dish_id]["price"] * item.quantity,
+        }
+        for item in payload.items
+    ]
+    total = sum(item["line_total"] for item in items)
 
-        oi = OrderItem(order_id=order.id, dish_id=item.dish_id, quantity=item.quantity)
-        db.add(oi)
+    created_at = datetime.utcnow()
+    if not has_partitions(created_at):
+        # создаёт периодическая проверка в lifespan (app/partitions.py), не запрос
+        raise HTTPException(status_code=503, detail="No orders partition for the current month yet")
+    try:
+        order_id = db.execute(CREATE_ORDER, {
+            "client_id": payload.client_id,
+            "created_at": created_at,
+            "payment_type": payload.payment_type,
+            "total": total,
+            "dish_ids": dish_ids,
+            "quantities": [item["quantity"] for item in items],
+            "prices": [item["unit_price"] for item in items],
+            "categories": [dishes[dish_id]["category"] for dish_id in dish_ids],
+            "tables": [ORDERS],
+        }).scalar()
+    except IntegrityError as e:
+        # блюдо или клиента удалили между проверкой и вставкой; партиции сообщают
+        # имя FK родительской таблицы
+        db.rollback()
+        constraint = _constraint_name(e)
+        if constraint == "order_items_dish_id_fkey":
+            raise HTTPException(status_code=404, detail="Dish not found")
+        if constraint in ("orders_client_id_fkey", "client_spend_client_id_fkey"):
+            raise HTTPException(status_code=404, detail="Client not found")
+        raise
+    if order_id is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Client not found")
+    db.commit()
+    set_write_lsn(db, response)
+    # ответ из уже известных значений, без refresh и lazy load items
+    return {
+        "id": order_id,
+        "client_id": payload.client_id,
+        "payment_type": payload.payment_type,
+        "created_at": created_at,
+        "total": total,
+        "items": items,
+    }
 
+
+@router.post("/bulk", response_model=BulkOrderOut)
+def create_orders_bulk(
+    response: Response,
+    rows: tuple = Depends(bulk_rows(OrderBulkCreate)),
+    db: Session = Depends(get_db),
+):
+    parsed, results = rows
+    valid: list[tuple[int, OrderBulkCreate]] = []
+
+    def reject(index: int, error: str):
+        results.append(rejected(index, error))
+
+    for index, payload in parsed:
+        if not payload.items:
+            reject(index, "Order must have items")
+            continue
+        dish_ids = [item.dish_id for item in payload.items]
+        if len(dish_ids) != len(set(dish_ids)):
+            reject(index, "Duplicate dish_id in order")
+            continue
+        valid.append((index, payload))
+
+    known_clients, dishes = _lookup_refs(
+        db,
+        {p.client_id for _, p in valid},
+        {item.dish_id for _, p in valid for item in p.items},
+    )
+
+    now = datetime.utcnow()
+    accepted: list[tuple[int, OrderBulkCreate]] = []
+    created = []  # ключ секционирования: один и тот же created_at у заказа и его позиций
+    for index, payload in valid:
+        if payload.client_id not in known_clients:
+            reject(index, "Client not found")
+            continue
+        missing = [item.dish_id for item in payload.items if item.dish_id not in dishes]
+        if missing:
+            reject(index, f"Dish not found: {missing[0]}")
+            continue
+        created_at = naive_utc(payload.created_at) if payload.created_at else now
+        if not has_partitions(created_at):
+            reject(index, f"No orders partition for {created_at:%Y-%m}")
+            continue
+        accepted.append((index, payload))
+        created.append(created_at)
+
+    totals = [
+        sum(dishes[item.dish_id]["price"] * item.quantity for item in p.items) for _, p in accepted
+    ]
+    insert_orders = insert(Order).returning(Order.id, sort_by_parameter_order=True)
+
+    for start in range(0, len(accepted), BULK_BATCH_SIZE):
+        batch = accepted[start:start + BULK_BATCH_SIZE]
+
+        order_ids = db.execute(
+            insert_orders,
+            [
+                {
+                    "client_id": p.client_id,
+                    "payment_type": p.payment_type,
+                    "created_at": created_at,
+                    "total": total,
+                }
+                for (_, p), total, created_at in zip(
+                    batch, totals[start:start + BULK_BATCH_SIZE], created[start:start + BULK_BATCH_SIZE]
+                )
+            ],
+        ).scalars().all()
+
+        db.execute(
+            insert(OrderItem),
+            [
+                {
+                    "order_id": order_id,
+                    "dish_id": item.dish_id,
+                    "created_at": created_at,
+                    "quantity": item.quantity,
+                    "unit_price": dishes[item.dish_id]["price"],
+                    "category": dishes[item.dish_id]["category"],
+                }
+                for order_id, (_, p), created_at in zip(
+                    order_ids, batch, created[start:start + BULK_BATCH_SIZE]
+                )
+                for item in p.items
+            ],
+        )
+
+        for order_id, (index, p) in zip(order_ids, batch):
+            results.append({"index": index, "status": "accepted", "order_id": order_id})
+
+    notify_orders(db)
+    # до агрегатов: строки блокируются в том же порядке, что и в create_order
+    bump_version(db, ORDERS)
+    record_client_spend(db, [(p.client_id, total) for (_, p), total in zip(accepted, totals)])
+    record_daily_revenue(db, [
+        (created_at, dishes[item.dish_id]["category"], p.payment_type,
+         dishes[item.dish_id]["price"] * item.quantity, item.quantity)
+        for (_, p), created_at in zip(accepted, created)
+        for item in p.items
+    ])
     db.commit()
-    db.refresh(order)
-    return order
+    set_write_lsn(db, response)
 
+    results.sort(key=lambda r: r["index"])
+    return {
+        "accepted": len(accepted),
+        "rejected": len(results) - len(accepted),
+        "results": results,
+    }
 
-@router.get("/{order_id}", response_model=OrderOut)
-def get_order(order_id: int, db: Session = Depends(get_db)):
-    # JOIN: orders -> order_items
-    order = (
-        db.query(Order)
-        .options(joinedload(Order.items))
-        .filter(Order.id == order_id)
-        .first()
+
+def _export_rows(since: Optional[datetime]):
+    # server-side cursor: в памяти только текущая пачка из EXPORT_CHUNK_SIZE строк
+    stmt = (
+        select(
+            Order.id, Order.client_id, Order.created_at, Order.payment_type, Order.total,
+            OrderItem.dish_id, OrderItem.quantity, OrderItem.unit_price,
+        )
+        .join(OrderItem, (OrderItem.order_id == Order.id) & (OrderItem.created_at == Order.created_at))
+        .order_by(Order.id, OrderItem.dish_id)
     )
-    if not order:
+    if since is not None:
+        stmt = stmt.where(Order.created_at >= naive_utc(since))
+
+    with read_engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE).execute(stmt)
+        for chunk in result.partitions():
+            yield chunk
+
+
+def _export_ndjson(since: Optional[datetime]):
+    # одна строка на заказ; строки заказа идут подряд (ORDER BY order_id)
+    order = None
+    for chunk in _export_rows(since):
+        lines = []
+        for r in chunk:
+            if order is None or order["id"] != r.id:
+                if order is not None:
+                    lines.append(json.dumps(order))
+                order = {
+                    "id": r.id,
+                    "client_id": r.client_id,
+                    "created_at": r.created_at.isoformat() if r.created_at else None,
+                    "payment_type": r.payment_type,
+                    "total": r.total,
+                    "items": [],
+                }
+            order["items"].append(
+                {"dish_id": r.dish_id, "quantity": r.quantity, "unit_price": r.unit_price}
+            )
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+    if order is not None:
+        yield (json.dumps(order) + "\n").encode()
+
+
+def _export_csv(since: Optional[datetime]):
+    # одна строка на позицию заказа
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    yield buf.getvalue().encode()
+
+    for chunk in _export_rows(since):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(
+            (
+                r.id, r.client_id, r.created_at.isoformat() if r.created_at else "",
+                r.payment_type, r.total, r.dish_id, r.quantity, r.unit_price,
+            )
+            for r in chunk
+        )
+        yield buf.getvalue().encode()
+
+
+@router.get("/export")
+def export_orders(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+):
+    if fmt == "csv":
+        return StreamingResponse(
+            _export_csv(since),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=orders.csv"},
+        )
+    return StreamingResponse(
+        _export_ndjson(since),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=orders.ndjson"},
+    )
+
+
+# Заказ целиком собирает Postgres (json_build_object / json_agg): один запрос,
+# без ORM-объектов и повторной валидации через OrderOut - ответ отдаётся как есть.
+ORDER_JSON = """
+    json_build_object(
+      'id', o.id,
+      'client_id', o.client_id,
+      'payment_type', o.payment_type,
+      'created_at', o.created_at,
+      'total', o.total,
+      'items', COALESCE((
+        SELECT json_agg(json_build_object(
+          'dish_id', oi.dish_id,
+          'dish_name', d.name,
+          'quantity', oi.quantity,
+          'unit_price', oi.unit_price,
+          'line_total', oi.unit_price * oi.quantity
+        ) ORDER BY oi.dish_id)
+        FROM order_items oi
+        JOIN dishes d ON d.id = oi.dish_id
+        WHERE oi.order_id = o.id AND oi.created_at = o.created_at
+      ), '[]')
+    )
+"""
+
+
+# позиция в ленте - (feed_xid, id), только завершённые транзакции (app/order_feed.py);
+# индекс ix_orders_feed_xid_id, по партициям - Merge Append до LIMIT
+FEED_ORDERS = text(f"""
+    SELECT CAST(o.feed_xid AS text), o.id, {ORDER_JSON}::text
+    FROM orders o
+    WHERE (o.feed_xid, o.id) > (CAST(:xid AS xid8), :order_id)
+      AND o.feed_xid < pg_snapshot_xmin(pg_current_snapshot())
+    ORDER BY o.feed_xid, o.id
+    LIMIT :limit
+""")
+
+
+def _feed_orders(conn, after: tuple[int, int]) -> list:
+    # [((feed_xid, id), JSON заказа как в GET /orders/{id})] по позиции
+    rows = conn.execute(FEED_ORDERS, {"xid": str(after[0]), "order_id": after[1], "limit": FEED_PAGE_SIZE})
+    return [((int(xid), order_id), body) for xid, order_id, body in rows]
+
+
+order_feed = OrderFeed(_feed_orders)
+
+
+# с primary: реплика может ещё не видеть заказы, о которых уже пришло уведомление
+def _feed_head() -> tuple[int, int]:
+    with engine.connect() as conn:
+        return feed_head(conn)
+
+
+def _feed_backlog(after: tuple[int, int]) -> list:
+    with engine.connect() as conn:
+        return _feed_orders(conn, after)
+
+
+@router.get("/feed")
+async def orders_feed(
+    after: Optional[str] = Query(None, description="event id, as in Last-Event-ID"),
+    last_event_id: Optional[str] = Header(None),
+):
+    # Server-sent events: "event: order", id = позиция в ленте, data = JSON заказа.
+    # Переподключение с Last-Event-ID (браузерный EventSource шлёт его сам) или
+    # ?after= сначала отдаёт пропущенные заказы, затем новые.
+    position = parse_event_id(last_event_id) or parse_event_id(after)
+    if after is not None and position is None:
+        raise HTTPException(status_code=400, detail="Invalid after")
+
+    async def events():
+        start = position or await run_in_threadpool(_feed_head)
+        # подписка до догрузки: заказ, закоммиченный между ними, не потеряется
+        sub = order_feed.subscribe(start)
+        try:
+            yield f"retry: {FEED_RETRY_MS}\n\n"
+            sent = start
+            while True:
+                page = await run_in_threadpool(_feed_backlog, sent)
+                for key, body in page:
+                    sent = key
+                    yield f"id: {format_event_id(key)}\nevent: order\ndata: {body}\n\n"
+                if len(page) < FEED_PAGE_SIZE:
+                    break
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), FEED_PING_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if item is None:
+                    return  # отстал - клиент переподключится с Last-Event-ID
+                key, body = item
+                if key > sent:  # уже отдано догрузкой
+                    sent = key
+                    yield f"id: {format_event_id(key)}\nevent: order\ndata: {body}\n\n"
+        finally:
+            order_feed.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{order_id}", response_model=OrderOut)
+def get_order(order_id: int, db: Session = Depends(get_read_db)):
+    body = db.execute(
+        text(f"SELECT {ORDER_JSON}::text FROM orders o WHERE o.id = :order_id"),
+        {"order_id": order_id},
+    ).scalar()
+    if body is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return json_response(body)
 
 
 @router.get("", response_model=list[OrderOut])
 def list_orders(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
 ):
-    orders = (
-        db.query(Order)
-        .options(joinedload(Order.items))
-        .order_by(Order.id.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-    return orders
+    params = {"limit": limit, "offset": offset}
+    keyset = "TRUE"
+    if cursor:
+        _, last_id = decode_cursor(cursor, "id", Order.id)
+        keyset, = after_cursor_sql("id", True, None)
+        params.update(cursor_id=last_id, offset=0)
+
+    body, count, last_id = db.execute(text(f"""
+        SELECT COALESCE(json_agg(page.doc ORDER BY page.id DESC), '[]')::text, COUNT(*), MIN(page.id)
+        FROM (
+          SELECT o.id, {ORDER_JSON} AS doc
+          FROM orders o
+          WHERE {keyset}
+          ORDER BY o.id DESC
+          LIMIT :limit OFFSET :offset
+        ) page
+    """), params).one()
+
+    if count == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor("id", last_id, last_id)
+    return json_response(body, response)
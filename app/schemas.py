@@ -1,5 +1,5 @@
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 class DishCreate(BaseModel):
@@ -20,6 +20,10 @@ class DishUpdate(BaseModel):
     meta: Optional[Dict[str, Any]] = None
 
 
+class DishBulkUpsert(DishCreate):
+    id: Optional[int] = None
+
+
 class DishOut(BaseModel):
     id: int
     name: str
@@ -50,6 +54,10 @@ class ClientUpdate(BaseModel):
     preferences: Optional[str] = None
 
 
+class ClientBulkUpsert(ClientCreate):
+    id: Optional[int] = None
+
+
 class ClientOut(BaseModel):
     id: int
     full_name: str
@@ -65,7 +73,7 @@ class ClientOut(BaseModel):
 
 class OrderItemCreate(BaseModel):
     dish_id: int
-    quantity: int
+    quantity: int = Field(gt=0)
 
 
 class OrderCreate(BaseModel):
@@ -74,9 +82,43 @@ class OrderCreate(BaseModel):
     items: List[OrderItemCreate]
 
 
+class OrderBulkCreate(OrderCreate):
+    created_at: Optional[datetime] = None
+
+
+class BulkOrderResult(BaseModel):
+    index: int
+    status: str
+    order_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkOrderOut(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BulkOrderResult]
+
+
+class BulkUpsertResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkUpsertOut(BaseModel):
+    created: int
+    updated: int
+    rejected: int
+    results: List[BulkUpsertResult]
+
+
 class OrderItemOut(BaseModel):
     dish_id: int
     quantity: int
+    unit_price: Optional[float] = None
+    dish_name: Optional[str] = None
+    line_total: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -87,6 +129,7 @@ class OrderOut(BaseModel):
     client_id: int
     payment_type: Optional[str] = None
     created_at: Optional[datetime] = None
+    total: Optional[float] = None
     items: List[OrderItemOut]
 
     class Config:
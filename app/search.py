@@ -0,0 +1,35 @@
+from sqlalchemy import func
+
+# Поиск q= по dishes.name и clients.full_name:
+# - q от 3 символов (целая триграмма): col %> q (word_similarity >=
+#   pg_trgm.word_similarity_threshold, 0.6) ORDER BY col <->> q, id - весь результат
+#   по близости, при равной - по id, страницы через offset детерминированы.
+#   Начало слова длиной от 3 символов всегда проходит порог (из n + 1 триграмм q
+#   у слова есть n), поэтому префиксные совпадения тоже в выдаче, а точное слово -
+#   на расстоянии 0. KNN-обход GiST gist_trgm_ops отдаёт строки по расстоянию;
+#   id добавляет Incremental Sort внутри групп равных расстояний. Оператор
+#   именно <->> (колонка слева): <<-> индекс не обслуживает. GIN по расстоянию
+#   строки не отдаёт - с ним пришлось бы сортировать все совпадения.
+# - q короче: близость по 1-2 символам не определена (триграмм слова не набрать),
+#   только префикс без учёта регистра: lower(col) COLLATE "C" LIKE 'q%'
+#   ORDER BY lower(col) COLLATE "C", id - упорядоченный диапазон btree.
+# Глубокие страницы (offset) дочитывают KNN-обход с начала.
+
+MIN_TRIGRAM_LENGTH = 3
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_key(col):
+    return func.lower(col).collate("C")
+
+
+def search_rows(query, col, id_col, q: str, offset: int, limit: int) -> list:
+    if len(q) < MIN_TRIGRAM_LENGTH:
+        prefix = _prefix_key(col).like(f"{_like_escape(q.lower())}%", escape="\\")
+        query = query.filter(prefix).order_by(_prefix_key(col), id_col)
+    else:
+        query = query.filter(col.op("%>")(q)).order_by(col.op("<->>")(q), id_col)
+    return query.offset(offset).limit(limit).all()
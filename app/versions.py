@@ -0,0 +1,91 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Conditional GET для справочников и /analytics.
+# table_versions хранит счётчик изменений dishes, clients и orders; роуты записи
+# увеличивают его в своей транзакции (bump_version до commit), так что новая
+# версия видна ровно тогда же, когда и сами данные. Для orders это один bump
+# на транзакцию записи заказов (create_order, /orders/bulk), не на заказ.
+# MAX(orders.id) версией быть не может: id берётся из sequence до commit, и
+# заказ с меньшим id, закоммиченный позже, MAX(id) не меняет.
+# Счётчик таблицы разбит на VERSION_SHARDS строк (shard = pid бэкенда по модулю),
+# версия - их сумма: блокировка строки держится до commit, и с одной строкой
+# все транзакции записи заказов шли бы по одной.
+# ETag считается по версиям таблиц, от которых зависит ответ; если он
+# совпал с If-None-Match, отдаём 304, не выполняя сам запрос.
+# Last-Modified - только для информации, If-Modified-Since 304 не даёт: время
+# ставится до commit, и транзакция, закоммиченная позже, может принести время
+# старше уже отданного.
+
+ORDERS = "orders"
+VERSION_SHARDS = 16
+
+# тот же upsert - в CTE create_order (app/routers/orders.py)
+BUMP_SQL = f"""
+    INSERT INTO table_versions (table_name, shard, version, updated_at)
+    SELECT t, mod(pg_backend_pid(), {VERSION_SHARDS}), 1, clock_timestamp()
+    FROM unnest(CAST(:tables AS text[])) AS t
+    ON CONFLICT (table_name, shard) DO UPDATE
+    SET version = table_versions.version + 1,
+        updated_at = GREATEST(table_versions.updated_at, clock_timestamp())
+"""
+DAILY_REVENUE = "daily_revenue"  # пересчёт rebuild_daily_revenue
+
+
+def bump_version(db: Session, *tables: str) -> None:
+    db.execute(text(BUMP_SQL), {"tables": sorted(tables)})
+
+
+def _versions(db: Session, tables: tuple[str, ...]) -> tuple[dict, Optional[datetime]]:
+    rows = db.execute(
+        text("""
+            SELECT table_name, SUM(version), MAX(updated_at)
+            FROM table_versions
+            WHERE table_name = ANY(CAST(:tables AS text[]))
+            GROUP BY table_name
+        """),
+        {"tables": sorted(tables)},
+    ).fetchall()
+
+    versions = {t: 0 for t in tables}
+    last_modified = None
+    for name, version, updated_at in rows:
+        versions[name] = version
+        if updated_at is not None and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return versions, last_modified
+
+
+def current_version(db: Session, table: str) -> int:
+    return db.execute(
+        text("SELECT SUM(version) FROM table_versions WHERE table_name = :table"), {"table": table}
+    ).scalar() or 0
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # слабое сравнение: W/"x" == "x"
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def check_not_modified(request: Request, response: Response, db: Session, *tables: str) -> dict:
+    # возвращает версии, по которым посчитан ETag: тело ответа должно быть не старше их
+    versions, last_modified = _versions(db, tables)
+    key = ";".join(f"{t}:{versions[t]}" for t in sorted(versions))
+    etag = 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:16] + '"'
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return versions
@@ -0,0 +1,71 @@
+"""Сравнение sync и async режимов API: requests/sec и p99 latency.
+
+Запустить два инстанса на одной базе:
+    uvicorn app.main:app --port 8000
+    DB_ASYNC=1 uvicorn app.main:app --port 8001
+
+и затем:
+    python3 scripts/bench_async.py --sync-url http://127.0.0.1:8000 --async-url http://127.0.0.1:8001
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROUTES = [
+    "/dishes?limit=50",
+    "/clients?limit=50",
+    "/orders?limit=50",
+    "/analytics/dishes/filter_sql?limit=50&sort_by=price",
+    "/analytics/top_clients_by_spend_sql",
+]
+
+
+def run(base_url, concurrency, total):
+    local = threading.local()
+
+    def one(i):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        path = ROUTES[i % len(ROUTES)]
+        start = time.perf_counter()
+        r = local.session.get(f"{base_url}{path}")
+        elapsed = time.perf_counter() - start
+        return elapsed, r.status_code < 400
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(t for t, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / wall, 1),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sync-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--async-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    report = {}
+    for name, url in (("sync", args.sync_url), ("async", args.async_url)):
+        run(url, args.concurrency, min(200, args.requests))  # прогрев пула
+        report[name] = run(url, args.concurrency, args.requests)
+        print(name, report[name])
+
+    print(json.dumps(report, indent=2))
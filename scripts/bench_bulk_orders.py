@@ -0,0 +1,94 @@
+"""Пропускная способность POST /orders/bulk в строках заказов в минуту.
+
+Берёт клиентов и блюда из засеянной базы (scripts.seed_db), отправляет
+--requests тел NDJSON по --orders заказов (позиций в заказе - как у сидера,
+1-5) подряд, по одному запросу за раз - один воркер. Без --url - в процессе
+через TestClient, с --url - в запущенный сервер (uvicorn без --workers).
+Время - от отправки тела до ответа, включая разбор и валидацию; генерация
+тел в замер не входит. Первый запрос (прогрев пула и dish_cache) в отчёт не попадает.
+
+    python3 -m scripts.bench_bulk_orders --requests 20 --orders 5000
+    python3 -m scripts.bench_bulk_orders --url http://127.0.0.1:8000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.db import engine
+from app.main import app
+
+ITEMS_PER_ORDER = ([1, 2, 3, 4, 5], [30, 35, 20, 10, 5])
+
+
+def make_body(rng, client_ids, dish_ids, orders) -> tuple[bytes, int]:
+    lines = []
+    n_items = 0
+    for _ in range(orders):
+        k = rng.choices(*ITEMS_PER_ORDER)[0]
+        n_items += k
+        lines.append(json.dumps({
+            "client_id": rng.choice(client_ids),
+            "payment_type": rng.choice(["cash", "card", "qr"]),
+            "items": [{"dish_id": d, "quantity": rng.randint(1, 3)} for d in rng.sample(dish_ids, k=k)],
+        }))
+    return "\n".join(lines).encode(), n_items
+
+
+def run(client, bodies) -> dict:
+    seconds = []
+    lines = accepted = 0
+    for n, (body, n_items) in enumerate(bodies):
+        start = time.perf_counter()
+        r = client.post("/orders/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+        elapsed = time.perf_counter() - start
+        r.raise_for_status()
+        result = r.json()
+        if result["rejected"]:
+            raise SystemExit(f"{result['rejected']} orders rejected: {result['results'][:3]}")
+        if n == 0:
+            continue  # прогрев
+        seconds.append(elapsed)
+        lines += n_items
+        accepted += result["accepted"]
+
+    total = sum(seconds)
+    return {
+        "requests": len(seconds),
+        "orders": accepted,
+        "lines": lines,
+        "seconds": round(total, 2),
+        "request_p50_ms": round(statistics.median(seconds) * 1000, 1),
+        "lines_per_min": round(lines / total * 60),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--orders", type=int, default=5000, help="orders per request")
+    parser.add_argument("--url", help="running server; default: in-process TestClient")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        client_ids = conn.execute(text("SELECT id FROM clients ORDER BY id LIMIT 10000")).scalars().all()
+        dish_ids = conn.execute(text("SELECT id FROM dishes ORDER BY id LIMIT 300")).scalars().all()
+    if not client_ids or len(dish_ids) < max(ITEMS_PER_ORDER[0]):
+        raise SystemExit("seed the database first: python3 -m scripts.seed_db")
+
+    rng = random.Random(args.seed)
+    bodies = [make_body(rng, client_ids, dish_ids, args.orders) for _ in range(args.requests + 1)]
+
+    if args.url:
+        with httpx.Client(base_url=args.url, timeout=300) as client:
+            report = run(client, bodies)
+    else:
+        with TestClient(app) as client:
+            report = run(client, bodies)
+    print(json.dumps(report, indent=2))
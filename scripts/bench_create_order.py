@@ -0,0 +1,86 @@
+"""Латентность POST /orders по числу позиций в заказе (в процессе, без HTTP-сервера).
+
+Берёт клиентов и блюда из засеянной базы (scripts.seed_db), для каждого
+--items создаёт --orders заказов подряд через TestClient и считает
+p50/p95/p99 и SQL-запросов на заказ (без COMMIT). Первые --warmup заказов
+(прогрев пула и dish_cache) в отчёт не попадают.
+
+    python3 -m scripts.bench_create_order --items 1 3 5 10 --orders 500
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app.db import async_engine, engine
+from app.main import app
+
+statements = 0
+
+
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def percentiles(latencies):
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "p50_ms": round(q[49] * 1000, 2),
+        "p95_ms": round(q[94] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+    }
+
+
+def run(client, client_ids, dish_ids, items, orders, warmup, rng):
+    global statements
+    latencies = []
+    counted = 0
+    for n in range(warmup + orders):
+        body = {
+            "client_id": rng.choice(client_ids),
+            "payment_type": rng.choice(["cash", "card"]),
+            "items": [
+                {"dish_id": d, "quantity": rng.randint(1, 3)} for d in rng.sample(dish_ids, k=items)
+            ],
+        }
+        statements = 0
+        start = time.perf_counter()
+        r = client.post("/orders", json=body)
+        elapsed = time.perf_counter() - start
+        r.raise_for_status()
+        if n >= warmup:
+            latencies.append(elapsed)
+            counted += statements
+    return {"orders": orders, **percentiles(latencies), "statements_per_order": round(counted / orders, 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for e in [engine] + ([async_engine.sync_engine] if async_engine is not None else []):
+        event.listen(e, "before_cursor_execute", _count)
+
+    with engine.connect() as conn:
+        client_ids = conn.execute(text("SELECT id FROM clients ORDER BY id LIMIT 1000")).scalars().all()
+        dish_ids = conn.execute(text("SELECT id FROM dishes ORDER BY id LIMIT 200")).scalars().all()
+    if not client_ids or len(dish_ids) < max(args.items):
+        raise SystemExit("seed the database first: python3 -m scripts.seed_db")
+
+    rng = random.Random(args.seed)
+    report = {}
+    with TestClient(app) as client:
+        for items in args.items:
+            report[f"{items} items"] = run(client, client_ids, dish_ids, items, args.orders, args.warmup, rng)
+            print(f"{items} items", report[f"{items} items"])
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,256 @@
+"""Нагрузочный бенчмарк эндпоинтов: смешанная нагрузка чтение/запись.
+
+Засевает данные через API (или берёт существующие с --no-seed), затем
+--concurrency потоков в течение --duration секунд выполняют случайные
+операции по весам из WORKLOAD. Id для запросов по одной записи - все
+засеянные, с --no-seed - случайная выборка по всему диапазону id (не первая
+страница списка). Отчёт (JSON): throughput и p50/p95/p99 по каждому маршруту.
+
+    python3 scripts/bench_endpoints.py --dishes 200 --clients 5000 --orders 100000 \\
+        --concurrency 32 --duration 60 --out bench.json
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import requests
+
+CATEGORIES = ["soup", "main", "dessert", "drink"]
+ORGANIZATIONS = ["YSU", "AUA", "RAU", "NPUA"]
+REVENUE_GROUPS = ["day", "month,category", "week,payment_type", "month,category,payment_type"]
+SAMPLE_IDS = 2000  # --no-seed: id на ресурс, случайно по всему диапазону
+
+
+# ---------- seed ----------
+
+def seed(base_url, n_dishes, n_clients, n_orders, rng):
+    s = requests.Session()
+
+    def post(path, data):
+        r = s.post(f"{base_url}{path}", json=data)
+        r.raise_for_status()
+        return r.json()
+
+    started = time.perf_counter()
+    dish_ids = [
+        post("/dishes", {
+            "name": f"bench dish {i}",
+            "price": rng.randint(500, 3000),
+            "calories": rng.randint(100, 900),
+            "portion_grams": rng.randint(150, 500),
+            "category": rng.choice(CATEGORIES),
+            "meta": {"tags": ["bench"], "rating": rng.randint(1, 5)},
+        })["id"]
+        for i in range(n_dishes)
+    ]
+
+    def make_client(i):
+        return post("/clients", {
+            "full_name": f"Bench Client {i}",
+            "age": rng.randint(18, 65),
+            "organization": rng.choice(ORGANIZATIONS),
+        })["id"]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        client_ids = list(pool.map(make_client, range(n_clients)))
+
+    order_ids = []
+    batch = 5000
+    for start in range(0, n_orders, batch):
+        rows = [
+            {
+                "client_id": rng.choice(client_ids),
+                "payment_type": rng.choice(["cash", "card"]),
+                "items": [
+                    {"dish_id": d, "quantity": rng.randint(1, 3)}
+                    for d in rng.sample(dish_ids, k=rng.randint(1, min(4, len(dish_ids))))
+                ],
+            }
+            for _ in range(min(batch, n_orders - start))
+        ]
+        results = post("/orders/bulk", rows)["results"]
+        order_ids.extend(row["order_id"] for row in results if row["status"] == "accepted")
+
+    report = {"dishes": n_dishes, "clients": n_clients, "orders": n_orders,
+              "seconds": round(time.perf_counter() - started, 2)}
+    return report, {"dish_ids": dish_ids, "client_ids": client_ids, "order_ids": order_ids}
+
+
+def existing_ids(base_url, rng, sample=SAMPLE_IDS):
+    # случайные id от 1 до максимального, которые отвечают 200: первые страницы
+    # списков - только самые старые/новые записи, горячие в кэше
+    s = requests.Session()
+    ids = {}
+    for key, path, newest in (
+        ("dish_ids", "/dishes", "sort_dir=desc"),
+        ("client_ids", "/clients", "sort_dir=desc"),
+        ("order_ids", "/orders", ""),  # /orders - всегда от новых к старым
+    ):
+        r = s.get(f"{base_url}{path}?limit=1&{newest}")
+        r.raise_for_status()
+        max_id = r.json()[0]["id"] if r.json() else 0
+        candidates = [rng.randint(1, max_id) for _ in range(sample * 2)] if max_id else []
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            found = pool.map(lambda i: s.get(f"{base_url}{path}/{i}").status_code == 200, candidates)
+            ids[key] = [i for i, ok in zip(candidates, found) if ok][:sample]
+    return ids
+
+
+def revenue_url(url, rng):
+    # период от дня до квартала где-то в последнем году
+    date_to = date.today() - timedelta(days=rng.randint(0, 365))
+    date_from = date_to - timedelta(days=rng.choice([0, 6, 29, 89]))
+    return (f"{url}/analytics/revenue?date_from={date_from}&date_to={date_to}"
+            f"&group_by={rng.choice(REVENUE_GROUPS)}")
+
+
+# ---------- workload ----------
+
+def create_order(s, url, ctx, rng):
+    dishes = rng.sample(ctx["dish_ids"], k=rng.randint(1, min(4, len(ctx["dish_ids"]))))
+    return s.post(f"{url}/orders", json={
+        "client_id": rng.choice(ctx["client_ids"]),
+        "payment_type": rng.choice(["cash", "card"]),
+        "items": [{"dish_id": d, "quantity": rng.randint(1, 3)} for d in dishes],
+    })
+
+
+# (маршрут, вес, функция запроса)
+WORKLOAD = [
+    ("POST /orders", 10, create_order),
+    ("GET /orders", 8, lambda s, url, ctx, rng: s.get(f"{url}/orders?limit=50")),
+    ("GET /orders/{id}", 8, lambda s, url, ctx, rng: s.get(f"{url}/orders/{rng.choice(ctx['order_ids'])}")),
+    ("GET /dishes", 10, lambda s, url, ctx, rng: s.get(
+        f"{url}/dishes?category={rng.choice(CATEGORIES)}&sort_by=price")),
+    ("GET /dishes/{id}", 10, lambda s, url, ctx, rng: s.get(f"{url}/dishes/{rng.choice(ctx['dish_ids'])}")),
+    ("GET /clients", 5, lambda s, url, ctx, rng: s.get(
+        f"{url}/clients?organization={rng.choice(ORGANIZATIONS)}&sort_by=age")),
+    ("GET /clients/{id}", 5, lambda s, url, ctx, rng: s.get(f"{url}/clients/{rng.choice(ctx['client_ids'])}")),
+    ("GET /analytics/dishes/filter_sql", 4, lambda s, url, ctx, rng: s.get(
+        f"{url}/analytics/dishes/filter_sql?category={rng.choice(CATEGORIES)}&min_calories=300")),
+    ("GET /analytics/clients/{id}/orders_sql", 4, lambda s, url, ctx, rng: s.get(
+        f"{url}/analytics/clients/{rng.choice(ctx['client_ids'])}/orders_sql")),
+    ("GET /analytics/top_clients_by_spend_sql", 4, lambda s, url, ctx, rng: s.get(
+        f"{url}/analytics/top_clients_by_spend_sql?limit=10")),
+    ("GET /analytics/orders/{id}/full_sql", 4, lambda s, url, ctx, rng: s.get(
+        f"{url}/analytics/orders/{rng.choice(ctx['order_ids'])}/full_sql")),
+    ("GET /analytics/revenue", 4, lambda s, url, ctx, rng: s.get(revenue_url(url, rng))),
+    # percent=0: UPDATE с блокировками строк, но цены не меняются
+    ("POST /analytics/dishes/raise_price_sql", 1, lambda s, url, ctx, rng: s.post(
+        f"{url}/analytics/dishes/raise_price_sql?category={rng.choice(CATEGORIES)}&percent=0")),
+]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    if len(latencies) < 2:
+        value = round(latencies[0] * 1000, 2) if latencies else None
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value, "max_ms": value}
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "p50_ms": round(q[49] * 1000, 2),
+        "p95_ms": round(q[94] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def run_workload(base_url, ctx, concurrency, duration, seed_value):
+    names = [name for name, _, _ in WORKLOAD]
+    weights = [weight for _, weight, _ in WORKLOAD]
+    calls = {name: fn for name, _, fn in WORKLOAD}
+    lock = threading.Lock()
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    def worker(n):
+        rng = random.Random(seed_value + n)
+        s = requests.Session()
+        local_lat = defaultdict(list)
+        local_err = defaultdict(int)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                r = calls[name](s, base_url, ctx, rng)
+                ok = r.status_code < 400
+            except requests.RequestException:
+                ok = False
+            local_lat[name].append(time.perf_counter() - start)
+            if not ok:
+                local_err[name] += 1
+        with lock:
+            for name, values in local_lat.items():
+                latencies[name].extend(values)
+            for name, count in local_err.items():
+                errors[name] += count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - started
+
+    routes = {}
+    for name in names:
+        values = latencies.get(name, [])
+        routes[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "rps": round(len(values) / wall, 1),
+            **percentiles(values),
+        }
+    everything = [t for values in latencies.values() for t in values]
+    total = {
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "rps": round(len(everything) / wall, 1),
+        **percentiles(everything),
+    }
+    return routes, total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--dishes", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--no-seed", action="store_true", help="use data already in the database")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seed_report = None
+    if args.no_seed:
+        ctx = existing_ids(args.base_url, rng)
+    else:
+        seed_report, ctx = seed(args.base_url, args.dishes, args.clients, args.orders, rng)
+
+    routes, total = run_workload(args.base_url, ctx, args.concurrency, args.duration, args.seed)
+    report = {
+        "config": {
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed": args.seed,
+        },
+        "seed": seed_report,
+        "total": total,
+        "routes": routes,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,81 @@
+"""Микробенчмарк сериализации страницы из --rows строк (без БД и HTTP).
+
+default - как FastAPI с response_model: валидация ORM-объектов через схему,
+dump в JSON-совместимые типы и json.dumps (JSONResponse);
+fast    - app/responses.fast_json (FAST_JSON=1): поля схемы + orjson.
+
+    python3 -m scripts.bench_serialization --rows 200
+"""
+import argparse
+import json
+import os
+import timeit
+from datetime import datetime, timedelta
+
+os.environ["FAST_JSON"] = "1"
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import Client, Dish
+from app.responses import fast_json
+from app.schemas import ClientOut, DishOut
+
+
+def dumps(content) -> bytes:
+    # JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def make_rows(n):
+    dishes = [
+        Dish(id=i, name=f"dish {i}", price=100.0 + i, calories=200 + i, portion_grams=300,
+             category="main", meta={"tags": ["vegan", "new"], "rating": 4})
+        for i in range(n)
+    ]
+    clients = [
+        Client(id=i, full_name=f"Client {i}", age=30, weight_kg=70, organization="YSU", preferences=None)
+        for i in range(n)
+    ]
+    start = datetime(2026, 1, 1)
+    analytics = [
+        {"order_id": i, "created_at": start + timedelta(minutes=i), "payment_type": "card", "total_sum": 1500.0}
+        for i in range(n)
+    ]
+    return dishes, clients, analytics
+
+
+def cases(n):
+    dishes, clients, analytics = make_rows(n)
+    dish_adapter = TypeAdapter(list[DishOut])
+    client_adapter = TypeAdapter(list[ClientOut])
+
+    def default_model(adapter, rows):
+        return lambda: dumps(adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json"))
+
+    return {
+        "dishes (ORM)": (default_model(dish_adapter, dishes), lambda: fast_json(dishes, model=DishOut).body),
+        "clients (ORM)": (default_model(client_adapter, clients), lambda: fast_json(clients, model=ClientOut).body),
+        "analytics (dict rows)": (lambda: dumps(jsonable_encoder(analytics)), lambda: fast_json(analytics).body),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    report = {}
+    for name, (default, fast) in cases(args.rows).items():
+        assert json.loads(default()) == json.loads(fast()), name
+        t_default = min(timeit.repeat(default, number=args.number, repeat=5)) / args.number
+        t_fast = min(timeit.repeat(fast, number=args.number, repeat=5)) / args.number
+        report[name] = {
+            "default_us": round(t_default * 1e6, 1),
+            "fast_us": round(t_fast * 1e6, 1),
+            "speedup": round(t_default / t_fast, 1),
+        }
+        print(name, report[name])
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,162 @@
+"""Проверка планов: ни один эндпоинт не делает Seq Scan по большим таблицам.
+
+Вызывает эндпоинты через TestClient (sync-режим), перехватывает их SQL и
+выполняет EXPLAIN для каждого запроса дважды:
+- real: план, который планировщик выбирает сам - его и получат запросы
+  (смысл проверки только на засеянной базе, на пустой Seq Scan дешевле всего);
+- index: с enable_seqscan=off - Seq Scan остаётся, только если подходящего
+  индекса нет, независимо от объёма данных.
+В real-плане Seq Scan считается только по таблицам от LARGE_TABLE_ROWS строк:
+для каталога блюд в сотни строк он и есть лучший план. Кэш блюд на время
+проверки выключен, иначе тёплые /dishes не делают запросов и проверять нечего.
+
+    python3 -m scripts.check_query_plans
+
+Код возврата 1, если Seq Scan найден хотя бы в одном из двух планов.
+Тот же прогон - tests/test_query_plans.py (пропускается без засеянной базы).
+"""
+import os
+import sys
+
+os.environ["DB_ASYNC"] = "0"
+# планы снимаются с engine (primary), туда же должны идти запросы
+os.environ["REPLICA_DATABASE_URL"] = ""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app.cache import dish_cache
+from app.db import engine
+from app.main import app
+from app.partitions import parent_table
+
+LARGE_TABLES = {"orders", "order_items", "clients", "client_spend", "dishes"}
+LARGE_TABLE_ROWS = 10_000  # порог для real-плана (pg_class.reltuples)
+
+captured = []
+
+
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        captured.append((statement, parameters))
+
+
+def seq_scans(plan) -> list[str]:
+    found = []
+    # партиции orders_y2026m01 и т.п. считаются как их родитель
+    if plan.get("Node Type") == "Seq Scan" and parent_table(plan.get("Relation Name", "")) in LARGE_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def at_least(tables: set[str], rows: int) -> set[str]:
+    # Seq Scan по пустой таблице (партиции будущих месяцев) - не находка: читать нечего,
+    # и в real-плане он всегда дешевле индекса. rows > 0 - ещё и по маленьким
+    if not tables:
+        return tables
+    with engine.connect() as conn:
+        return set(conn.execute(
+            text("""
+                SELECT relname FROM pg_class
+                WHERE relname = ANY(:names) AND pg_relation_size(oid) > 0 AND (:rows = 0 OR reltuples >= :rows)
+            """),
+            {"names": sorted(tables), "rows": rows},
+        ).scalars())
+
+
+def explain(statement, parameters, real: bool):
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        if not real:
+            cur.execute("SET enable_seqscan = off")
+        cur.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        return cur.fetchone()[0][0]["Plan"]
+    finally:
+        raw.rollback()
+        raw.close()
+
+
+def sample_urls(client: TestClient) -> list[str]:
+    with engine.connect() as conn:
+        order_id, client_id = conn.execute(
+            text("SELECT id, client_id FROM orders ORDER BY id DESC LIMIT 1")
+        ).one()
+        dish_id, category = conn.execute(
+            text("SELECT id, category FROM dishes ORDER BY id LIMIT 1")
+        ).one()
+        organization = conn.execute(text("SELECT organization FROM clients LIMIT 1")).scalar()
+
+    urls = [
+        f"/dishes?category={category}",
+        "/dishes?sort_by=price&min_price=10",
+        "/dishes?sort_by=calories&sort_dir=desc",
+        "/dishes?sort_by=name",
+        "/dishes?tag=vegan&min_rating=4&sort_by=price",
+        f"/dishes/{dish_id}",
+        f"/clients?organization={organization}",
+        "/clients?sort_by=age&min_age=30",
+        "/clients?sort_by=full_name&sort_dir=desc",
+        f"/clients/{client_id}",
+        "/orders",
+        f"/orders/{order_id}",
+        f"/analytics/dishes/filter_sql?category={category}&min_calories=200&sort_by=price",
+        "/analytics/dishes/filter_sql?tag=vegan&tag=kids&min_rating=4",
+        '/dishes?meta_contains={"rating":1}&min_rating=1',
+        f"/analytics/clients/{client_id}/orders_sql",
+        f"/analytics/clients/{client_id}/orders_sql?date_from=2026-01-01&date_to=2026-02-01",
+        "/analytics/top_clients_by_spend_sql",
+        f"/analytics/orders/{order_id}/full_sql",
+    ]
+
+    # следующие страницы по курсору
+    for url in list(urls):
+        if "?" not in url:
+            continue
+        r = client.get(f"{url}&limit=2")
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor:
+            urls.append(f"{url}&limit=2&cursor={cursor}")
+    return urls
+
+
+def check(client: TestClient) -> list[str]:
+    # строки отчёта по каждому url; находки начинаются с "ERROR" / "SEQ SCAN"
+    dish_cache.ttl_seconds = 0
+    dish_cache.invalidate()
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        return [check_url(client, url) for url in sample_urls(client)]
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+
+def check_url(client: TestClient, url: str) -> str:
+    captured.clear()
+    r = client.get(url)
+    if r.status_code >= 400:
+        return f"ERROR {url}: HTTP {r.status_code}"
+
+    scans = {"real": set(), "index": set()}
+    for statement, parameters in captured:
+        scans["real"].update(seq_scans(explain(statement, parameters, real=True)))
+        scans["index"].update(seq_scans(explain(statement, parameters, real=False)))
+    scans = {"real": at_least(scans["real"], LARGE_TABLE_ROWS), "index": at_least(scans["index"], 0)}
+
+    if scans["real"] or scans["index"]:
+        found = "; ".join(f"{mode}: {', '.join(sorted(tables))}" for mode, tables in scans.items() if tables)
+        return f"SEQ SCAN {url}: {found}"
+    return f"ok       {url} ({len(captured)} queries)"
+
+
+def main() -> int:
+    report = check(TestClient(app))
+    for line in report:
+        print(line)
+    return 1 if any(not line.startswith("ok") for line in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
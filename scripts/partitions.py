@@ -0,0 +1,33 @@
+"""Обслуживание месячных партиций orders / order_items (для cron).
+
+    python3 -m scripts.partitions                          # создать партиции на --ahead месяцев вперёд
+    python3 -m scripts.partitions --from 2024-01           # и все месяцы с января 2024 (старые заказы)
+    python3 -m scripts.partitions --detach-before 2025-01  # отцепить месяцы раньше января 2025
+
+Отцепленные таблицы (orders_y2024m12, ...) остаются в базе: их можно
+выгрузить и удалить через DROP TABLE. client_spend их заказы не теряет
+до следующего rebuild_client_spend.
+"""
+import argparse
+from datetime import datetime
+
+from app.config import settings
+from app.partitions import detach_partitions, ensure_future_partitions, ensure_partitions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ahead", type=int, default=settings.partition_months_ahead)
+    parser.add_argument("--from", dest="date_from", help="YYYY-MM: also create months from this one to now")
+    parser.add_argument("--detach-before", help="YYYY-MM")
+    args = parser.parse_args()
+
+    if args.date_from:
+        start = datetime.strptime(args.date_from, "%Y-%m").date()
+        for name in ensure_partitions(start, datetime.utcnow().date()):
+            print(f"created  {name}")
+    for name in ensure_future_partitions(args.ahead):
+        print(f"created  {name}")
+    if args.detach_before:
+        before = datetime.strptime(args.detach_before, "%Y-%m").date()
+        for name in detach_partitions(before):
+            print(f"detached {name}")
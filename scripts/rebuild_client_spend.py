@@ -0,0 +1,16 @@
+"""Пересчёт client_spend по всей истории заказов.
+
+    python3 -m scripts.rebuild_client_spend
+"""
+from app.aggregates import rebuild_client_spend
+from app.db import SessionLocal
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        clients = rebuild_client_spend(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"client_spend rebuilt: {clients} clients")
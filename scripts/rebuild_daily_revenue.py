@@ -0,0 +1,24 @@
+"""Пересчёт daily_revenue по заказам: за период или за всё время.
+
+    python3 -m scripts.rebuild_daily_revenue [--from 2026-01-01] [--to 2026-01-31]
+"""
+import argparse
+from datetime import date
+
+from app.aggregates import rebuild_daily_revenue
+from app.db import SessionLocal
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_revenue(db, args.date_from, args.date_to)
+        db.commit()
+    finally:
+        db.close()
+    print(f"daily_revenue rebuilt: {rows} rows")
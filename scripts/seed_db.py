@@ -0,0 +1,278 @@
+"""Быстрый сидер прямо в Postgres через COPY (без API).
+
+Детерминированный (seeded RNG на каждый чанк, результат не зависит от
+--workers), с реалистичными распределениями:
+- популярность блюд и активность клиентов - степенные (Zipf-подобные);
+- created_at: пики в обед, меньшие пики утром и вечером, выходные тише;
+- несколько организаций с разным размером.
+
+Заказы генерируются чанками в --workers процессах, каждый процесс сам
+делает COPY своего чанка. Таблицы и списки колонок COPY берутся из
+app/models.py (без колонок с server_default, их заполняет Postgres); значения
+строки передаются по имени колонки, и колонка модели, для которой сидер не
+даёт значения, - KeyError с её именем, а не сдвиг CSV.
+Диапазоны id резервируются в sequence до вставки, так что сидер можно
+запускать на живой базе: заказы через API получают id после диапазона.
+
+    python3 -m scripts.seed_db --dishes 300 --clients 200000 --orders 3000000 --workers 8
+"""
+import argparse
+import io
+import multiprocessing
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import psycopg2
+from sqlalchemy.engine import make_url
+
+from app.aggregates import rebuild_client_spend, rebuild_daily_revenue
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Client, Dish, Order, OrderItem
+from app.partitions import ensure_partitions
+from app.versions import bump_version
+
+CATEGORIES = ["soup", "main", "salad", "dessert", "drink", "side"]
+CATEGORY_PRICE = {
+    "soup": (600, 1400), "main": (1500, 3500), "salad": (800, 1800),
+    "dessert": (700, 1600), "drink": (300, 900), "side": (400, 1000),
+}
+TAGS = ["vegan", "vegetarian", "spicy", "gluten_free", "halal", "new", "kids"]
+# (организация, доля клиентов)
+ORGANIZATIONS = [("YSU", 0.4), ("AUA", 0.2), ("RAU", 0.15), ("NPUA", 0.15), (None, 0.1)]
+PAYMENT_TYPES = (["card", "cash", "qr"], [70, 25, 5])
+ITEMS_PER_ORDER = ([1, 2, 3, 4, 5], [30, 35, 20, 10, 5])
+QUANTITY = ([1, 2, 3], [80, 15, 5])
+
+
+def connect():
+    url = make_url(settings.database_url)
+    return psycopg2.connect(**url.translate_connect_args(username="user", database="dbname"))
+
+
+def copy_columns(table) -> list[str]:
+    return [c.name for c in table.columns if c.server_default is None]
+
+
+def line_format(table) -> str:
+    # шаблон строки CSV для str.format по copy_columns, для горячих циклов;
+    # значения вставляются как есть - только числа, даты и строки без кавычек и запятых
+    return ",".join("{%s}" % name for name in copy_columns(table)) + "\n"
+
+
+def copy_rows(cur, table, lines):
+    buf = io.StringIO("".join(lines))
+    cur.copy_expert(
+        f"COPY {table.name} ({', '.join(copy_columns(table))}) FROM STDIN WITH (FORMAT csv)", buf
+    )
+
+
+def csv_value(v):
+    if v is None:
+        return ""
+    if isinstance(v, str):
+        return '"' + v.replace('"', '""') + '"'
+    return str(v)
+
+
+def csv_line(table, values: dict):
+    return ",".join(csv_value(values[name]) for name in copy_columns(table)) + "\n"
+
+
+def zipf_cum_weights(n, s):
+    return list(accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+# ---------- dishes / clients ----------
+
+def seed_dishes(cur, rng, first_id, n):
+    rows = []
+    dishes = {}
+    for dish_id in range(first_id, first_id + n):
+        category = rng.choice(CATEGORIES)
+        low, high = CATEGORY_PRICE[category]
+        price = float(rng.randrange(low, high, 50))
+        tags = rng.sample(TAGS, k=rng.choice([0, 1, 1, 2, 3]))
+        meta = '{"tags": [%s], "rating": %d}' % (
+            ", ".join(f'"{t}"' for t in tags), rng.choices([1, 2, 3, 4, 5], [3, 7, 20, 40, 30])[0]
+        )
+        rows.append(csv_line(Dish.__table__, {
+            "id": dish_id, "name": f"{category} {dish_id}", "price": price,
+            "calories": rng.randint(80, 1100), "portion_grams": rng.randint(150, 500),
+            "category": category, "meta": meta,
+        }))
+        dishes[dish_id] = (price, category)
+    copy_rows(cur, Dish.__table__, rows)
+    return dishes
+
+
+def seed_clients(cur, rng, first_id, n):
+    orgs, shares = zip(*ORGANIZATIONS)
+    rows = []
+    for client_id in range(first_id, first_id + n):
+        rows.append(csv_line(Client.__table__, {
+            "id": client_id,
+            "full_name": f"Client {client_id}",
+            "age": max(16, min(80, int(rng.gauss(32, 11)))),
+            "weight_kg": max(40, min(140, int(rng.gauss(72, 13)))),
+            "organization": rng.choices(orgs, shares)[0],
+            "preferences": None,
+        }))
+    copy_rows(cur, Client.__table__, rows)
+
+
+# ---------- orders ----------
+
+def order_time(rng, start: datetime, days: int) -> datetime:
+    day = start + timedelta(days=rng.randrange(days))
+    if day.weekday() >= 5 and rng.random() < 0.6:  # выходные тише
+        day = start + timedelta(days=rng.randrange(days))
+    r = rng.random()
+    if r < 0.6:
+        minutes = rng.gauss(13 * 60, 40)  # обед
+    elif r < 0.75:
+        minutes = rng.gauss(9 * 60, 30)
+    elif r < 0.9:
+        minutes = rng.gauss(18 * 60, 45)
+    else:
+        minutes = rng.uniform(7 * 60, 21 * 60)
+    minutes = max(6 * 60, min(23 * 60, minutes))
+    return day + timedelta(minutes=minutes, seconds=rng.random() * 60)
+
+
+def seed_order_chunk(task):
+    (chunk, first_order_id, n_orders, seed, dishes, client_range, start, days) = task
+    rng = random.Random(seed * 1_000_003 + chunk)
+
+    dish_ids = list(dishes)
+    rng_dishes = random.Random(seed)  # одинаковый порядок популярности во всех чанках
+    rng_dishes.shuffle(dish_ids)
+    dish_cum = zipf_cum_weights(len(dish_ids), 1.1)
+
+    first_client, n_clients = client_range
+    client_cum = zipf_cum_weights(n_clients, 0.6)
+
+    clients = rng.choices(range(first_client, first_client + n_clients), cum_weights=client_cum, k=n_orders)
+    sizes = rng.choices(*ITEMS_PER_ORDER, k=n_orders)
+    picks = iter(rng.choices(dish_ids, cum_weights=dish_cum, k=sum(sizes)))
+    payments = rng.choices(*PAYMENT_TYPES, k=n_orders)
+
+    order_line = line_format(Order.__table__)
+    item_line = line_format(OrderItem.__table__)
+    order_lines = []
+    item_lines = []
+    for i in range(n_orders):
+        order_id = first_order_id + i
+        created_at = order_time(rng, start, days).isoformat(sep=" ")
+        total = 0.0
+        seen = set()
+        for _ in range(sizes[i]):
+            dish_id = next(picks)
+            if dish_id in seen:
+                continue
+            seen.add(dish_id)
+            quantity = rng.choices(*QUANTITY)[0]
+            price, category = dishes[dish_id]
+            total += price * quantity
+            item_lines.append(item_line.format(
+                order_id=order_id, dish_id=dish_id, created_at=created_at,
+                quantity=quantity, unit_price=price, category=category,
+            ))
+        order_lines.append(order_line.format(
+            id=order_id, client_id=clients[i], created_at=created_at, payment_type=payments[i], total=total,
+        ))
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            copy_rows(cur, Order.__table__, order_lines)
+            copy_rows(cur, OrderItem.__table__, item_lines)
+        conn.commit()
+    finally:
+        conn.close()
+    return n_orders, len(item_lines)
+
+
+def reserve_ids(cur, table, n):
+    # n id подряд: ALTER SEQUENCE держит блокировку до commit, и nextval других
+    # сессий ждёт, так что весь диапазон - наш. Вызывать в короткой транзакции.
+    # Первый id - обычным nextval: у новой sequence он отдаёт стартовое значение
+    # без прибавки INCREMENT, и "последний минус n" ушёл бы в отрицательные id
+    cur.execute(f"SELECT pg_get_serial_sequence('{table.name}', 'id')")
+    seq = cur.fetchone()[0]
+    cur.execute(f"ALTER SEQUENCE {seq} INCREMENT BY 1")  # блокировка
+    cur.execute("SELECT nextval(%s)", (seq,))
+    first = cur.fetchone()[0]
+    if n > 1:
+        cur.execute(f"ALTER SEQUENCE {seq} INCREMENT BY {n - 1}")
+        cur.execute("SELECT nextval(%s)", (seq,))
+        cur.execute(f"ALTER SEQUENCE {seq} INCREMENT BY 1")
+    return first
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dishes", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365, help="spread orders over the last N days")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk", type=int, default=20_000, help="orders per COPY chunk")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+
+    conn = connect()
+    with conn.cursor() as cur:
+        first_dish = reserve_ids(cur, Dish.__table__, args.dishes)
+        first_client = reserve_ids(cur, Client.__table__, args.clients)
+        first_order = reserve_ids(cur, Order.__table__, args.orders)
+    conn.commit()
+    with conn.cursor() as cur:
+        dishes = seed_dishes(cur, rng, first_dish, args.dishes)
+        seed_clients(cur, rng, first_client, args.clients)
+    conn.commit()
+    print(f"dishes: {args.dishes}, clients: {args.clients} ({time.perf_counter() - started:.1f}s)")
+
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=args.days)
+    ensure_partitions(start, start + timedelta(days=args.days))
+    tasks = [
+        (chunk, first_order + offset, min(args.chunk, args.orders - offset), args.seed,
+         dishes, (first_client, args.clients), start, args.days)
+        for chunk, offset in enumerate(range(0, args.orders, args.chunk))
+    ]
+
+    orders = lines = 0
+    orders_started = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        for n_orders, n_lines in pool.imap_unordered(seed_order_chunk, tasks):
+            orders += n_orders
+            lines += n_lines
+            rate = lines / (time.perf_counter() - orders_started) * 60
+            print(f"\rorders: {orders}/{args.orders}, lines: {lines} ({rate:,.0f} lines/min)", end="")
+    print()
+
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE")
+    conn.close()
+
+    # каждый шаг - своя транзакция: create_order сначала обновляет table_versions,
+    # потом client_spend / daily_revenue_log; bump_version под EXCLUSIVE-блокировками
+    # пересчёта шёл бы в обратном порядке (deadlock с живыми заказами)
+    db = SessionLocal()
+    try:
+        rebuild_client_spend(db)
+        db.commit()
+        rebuild_daily_revenue(db)
+        db.commit()
+        bump_version(db, "dishes", "clients", "orders")  # сбросить ETag у клиентов API
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"done in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,62 @@
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy.exc import IntegrityError
+
+from app.routers import orders
+from app.schemas import OrderCreate
+
+
+class Diag:
+    def __init__(self, constraint_name):
+        self.constraint_name = constraint_name
+
+
+class ForeignKeyViolation(Exception):
+    def __init__(self, constraint_name):
+        super().__init__(constraint_name)
+        self.diag = Diag(constraint_name)
+
+
+class FailingSession:
+    # CREATE_ORDER падает с нарушением constraint
+    def __init__(self, constraint_name):
+        self.constraint_name = constraint_name
+        self.rolled_back = False
+
+    def execute(self, *args, **kwargs):
+        raise IntegrityError("CREATE_ORDER", {}, ForeignKeyViolation(self.constraint_name))
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    dishes = {1: {"name": "Soup", "price": 3.0, "category": "soups"}}
+    monkeypatch.setattr(orders.dish_cache, "get_dishes", lambda db, ids: {i: dishes[i] for i in ids if i in dishes})
+    monkeypatch.setattr(orders, "has_partitions", lambda created_at: True)
+
+
+def create(db):
+    payload = OrderCreate(client_id=7, items=[{"dish_id": 1, "quantity": 2}])
+    return orders.create_order(payload, Response(), db)
+
+
+@pytest.mark.parametrize("constraint, detail", [
+    ("order_items_dish_id_fkey", "Dish not found"),
+    ("orders_client_id_fkey", "Client not found"),
+    ("client_spend_client_id_fkey", "Client not found"),
+])
+def test_create_order_maps_foreign_keys_to_404(constraint, detail):
+    db = FailingSession(constraint)
+    with pytest.raises(HTTPException) as e:
+        create(db)
+    assert (e.value.status_code, e.value.detail) == (404, detail)
+    assert db.rolled_back
+
+
+def test_create_order_reraises_other_integrity_errors():
+    db = FailingSession("orders_y2026m01_pkey")
+    with pytest.raises(IntegrityError):
+        create(db)
+    assert db.rolled_back
@@ -0,0 +1,69 @@
+import asyncio
+from contextlib import nullcontext
+
+import pytest
+
+from app import order_feed
+from app.order_feed import OrderFeed
+
+
+@pytest.fixture(autouse=True)
+def no_listener(monkeypatch):
+    # без потока-слушателя и без БД: _deliver вызывается из теста
+    monkeypatch.setattr(OrderFeed, "_run", lambda self: None)
+    monkeypatch.setattr(order_feed, "engine", type("Engine", (), {"connect": lambda self: nullcontext()})())
+
+
+def test_subscriber_joining_during_load_gets_the_page():
+    async def main():
+        loop = asyncio.get_running_loop()
+        late = []
+
+        async def subscribe_late():
+            return feed.subscribe((1, 0))
+
+        def load(conn, after):
+            if not late:
+                # подписка во время чтения: её догрузка - по более раннему снимку
+                late.append(asyncio.run_coroutine_threadsafe(subscribe_late(), loop).result())
+            return [((2, 7), '{"id":7}')] if after == (1, 0) else []
+
+        feed = OrderFeed(load)
+        first = feed.subscribe((1, 0))
+        await loop.run_in_executor(None, feed._deliver)
+        await asyncio.sleep(0)
+
+        assert first.queue.get_nowait() == ((2, 7), '{"id":7}')
+        assert late[0].queue.get_nowait() == ((2, 7), '{"id":7}')
+        assert feed.position == (2, 7)
+
+    asyncio.run(main())
+
+
+def test_position_of_new_first_subscriber_is_not_overwritten():
+    async def main():
+        loop = asyncio.get_running_loop()
+        calls = []
+
+        async def resubscribe():
+            feed.unsubscribe(first)
+            return feed.subscribe((5, 0))
+
+        def load(conn, after):
+            calls.append(after)
+            if len(calls) == 1:
+                calls.append(asyncio.run_coroutine_threadsafe(resubscribe(), loop).result())
+                return [((2, 7), '{"id":7}')]
+            return [((6, 9), '{"id":9}')] if after == (5, 0) else []
+
+        feed = OrderFeed(load)
+        first = feed.subscribe((1, 0))
+        await loop.run_in_executor(None, feed._deliver)
+        await asyncio.sleep(0)
+
+        second = calls[1]
+        assert second.queue.get_nowait() == ((6, 9), '{"id":9}')
+        assert second.queue.empty()
+        assert feed.position == (6, 9)
+
+    asyncio.run(main())
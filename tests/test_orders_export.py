@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from app.routers import orders
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execution_options(self, **options):
+        return self
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        return type("Result", (), {"partitions": lambda self: iter(())})()
+
+
+def test_export_since_with_offset_compares_in_utc(monkeypatch):
+    conn = RecordingConnection()
+    monkeypatch.setattr(orders, "read_engine", type("Engine", (), {"connect": lambda self: conn})())
+
+    list(orders._export_rows(datetime.fromisoformat("2026-01-01T00:00:00+04:00")))
+
+    params = conn.statements[0].compile().params
+    assert list(params.values()) == [datetime(2025, 12, 31, 20, 0)]
@@ -0,0 +1,41 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models import Client, Dish, Order
+from app.pagination import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("sort_by, sort_col, value", [
+    ("price", Dish.price, 9.5),
+    ("price", Dish.price, 10),
+    ("calories", Dish.calories, 300),
+    ("calories", Dish.calories, None),
+    ("name", Dish.__table__.c.name, "Borscht"),
+    ("full_name", Client.full_name, "Ann"),
+    ("id", Order.id, 42),
+])
+def test_decode_cursor_round_trip(sort_by, sort_col, value):
+    assert decode_cursor(encode_cursor(sort_by, value, 42), sort_by, sort_col) == (value, 42)
+
+
+@pytest.mark.parametrize("sort_by, sort_col, value, last_id", [
+    ("price", Dish.price, "abc", 5),
+    ("price", Dish.price, [1], 5),
+    ("price", Dish.price, None, 5),  # price NOT NULL
+    ("price", Dish.price, True, 5),
+    ("calories", Dish.calories, 1.5, 5),
+    ("calories", Dish.calories, {"a": 1}, 5),
+    ("name", Dish.name, 3, 5),
+    ("id", Order.id, 5, True),
+    ("id", Order.id, "5", 5),
+])
+def test_decode_cursor_rejects_mismatched_types(sort_by, sort_col, value, last_id):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(encode_cursor(sort_by, value, last_id), sort_by, sort_col)
+    assert e.value.status_code == 400
+
+
+def test_decode_cursor_rejects_other_sort_by():
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(encode_cursor("price", 9.5, 1), "calories", Dish.calories)
+    assert e.value.status_code == 400
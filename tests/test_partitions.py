@@ -0,0 +1,47 @@
+import threading
+
+from app import partitions
+
+
+def test_first_check_runs_in_background(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def ensure(months_ahead):
+        calls.append(months_ahead)
+        started.set()
+        release.wait(5)  # медленный DDL или ожидание блокировки
+        return []
+
+    monkeypatch.setattr(partitions, "ensure_future_partitions", ensure)
+    stop = partitions.start_partition_checks(3, 3600)
+    try:
+        # вызов вернулся, не дожидаясь проверки, а сама проверка уже идёт
+        assert started.wait(5)
+        assert calls == [3]
+    finally:
+        release.set()
+        stop.set()
+
+
+def test_first_check_retries_when_periodic_checks_are_off(monkeypatch):
+    calls = []
+    done = threading.Event()
+
+    def ensure(months_ahead):
+        calls.append(months_ahead)
+        if len(calls) == 1:
+            raise RuntimeError("database is starting up")
+        done.set()
+        return []
+
+    monkeypatch.setattr(partitions, "RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(partitions, "ensure_future_partitions", ensure)
+    stop = partitions.start_partition_checks(3, 0)
+    try:
+        assert done.wait(5)
+        assert not stop.wait(0.1)
+        assert len(calls) == 2  # после успешной первой проверки поток завершился
+    finally:
+        stop.set()
@@ -0,0 +1,26 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import exc, text
+
+from app.cache import dish_cache
+from app.db import engine
+from app.main import app
+from scripts import check_query_plans
+
+
+@pytest.fixture
+def seeded_db():
+    # нужна засеянная база (scripts.seed_db): на пустой проверять нечего
+    try:
+        with engine.connect() as conn:
+            seeded = conn.execute(text("SELECT EXISTS (SELECT FROM orders)")).scalar()
+    except exc.DBAPIError as e:
+        pytest.skip(f"no database: {e.orig}")
+    if not seeded:
+        pytest.skip("database is not seeded")
+
+
+def test_no_seq_scans_on_large_tables(seeded_db, monkeypatch):
+    monkeypatch.setattr(dish_cache, "ttl_seconds", dish_cache.ttl_seconds)  # check() выключает кэш
+    report = check_query_plans.check(TestClient(app))
+    assert [line for line in report if not line.startswith("ok")] == []
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.recommendations import AlsoOrdered
+from app.routers import dishes
+
+DISHES = {1: {"name": "Soup", "price": 3.0}, 2: {"name": "Bread", "price": 1.0}, 3: {"name": "Tea", "price": 2.0}}
+
+
+def snapshot(*orders):
+    order_ids = [order_id for order_id, items in orders for _ in items]
+    dish_ids = [dish_id for _, items in orders for dish_id in items]
+    return np.array(order_ids, dtype=np.int64), np.array(dish_ids, dtype=np.int64), DISHES
+
+
+@pytest.fixture
+def recs(monkeypatch):
+    recs = AlsoOrdered(top_n=10)
+    monkeypatch.setattr(recs, "_follow", lambda: None)
+    return recs
+
+
+def test_feed_skips_orders_already_in_the_snapshot(recs, monkeypatch):
+    monkeypatch.setattr(recs, "_load", lambda: snapshot((10, [1, 2])))
+    recs.rebuild()
+
+    # лента отстаёт от снимка: заказ 10 уже посчитан, 11 - новый (с другого воркера)
+    recs._record_orders([((5, 10), (10, [1, 2])), ((6, 11), (11, [1, 2, 3]))])
+
+    assert recs.top(1, 10) == [(2, 2), (1, 3)]
+
+
+def test_rebuild_keeps_feed_orders_missing_from_its_snapshot(recs, monkeypatch):
+    monkeypatch.setattr(recs, "_load", lambda: snapshot((10, [1, 2])))
+    recs.rebuild()
+    recs._record_orders([((6, 11), (11, [1, 3])), ((6, 12), (12, [1, 3]))])
+
+    # новая сборка видит заказ 11, но ещё не 12 (например, отстающая реплика)
+    monkeypatch.setattr(recs, "_load", lambda: snapshot((10, [1, 2]), (11, [1, 3])))
+    recs.rebuild()
+
+    assert recs.top(1, 10) == [(2, 3), (1, 2)]
+    assert recs._recent == [(12, [1, 3])]
+
+
+def test_also_ordered_answers_from_the_snapshot(recs, monkeypatch):
+    monkeypatch.setattr(dishes, "also_ordered", recs)
+    with pytest.raises(HTTPException) as e:
+        dishes.also_ordered_dishes(1, limit=10)
+    assert e.value.status_code == 503
+
+    monkeypatch.setattr(recs, "_load", lambda: snapshot((10, [1, 2])))
+    recs.rebuild()
+
+    assert dishes.also_ordered_dishes(1, limit=10) == [{"dish_id": 2, "name": "Bread", "price": 1.0, "count": 1}]
+    with pytest.raises(HTTPException) as e:
+        dishes.also_ordered_dishes(99, limit=10)
+    assert e.value.status_code == 404
@@ -0,0 +1,30 @@
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from app.models import Client
+from app.search import search_rows
+
+
+class CompiledQuery(Query):
+    # вместо выполнения - SQL запроса
+    def all(self):
+        return " ".join(str(self.statement.compile(dialect=postgresql.dialect())).split())
+
+
+def search_sql(q: str, offset: int = 0) -> str:
+    return search_rows(CompiledQuery([Client]), Client.full_name, Client.id, q, offset, 50)
+
+
+def test_search_ranks_every_page_by_similarity_then_id():
+    sql = search_sql("ivanov", offset=100)
+    assert "clients.full_name %%> %(full_name_1)s" in sql  # % экранирован для psycopg2
+    assert "ORDER BY clients.full_name <->> %(full_name_2)s, clients.id" in sql
+    assert "OFFSET" in sql
+    assert "LIKE" not in sql
+
+
+def test_short_search_is_a_prefix_scan():
+    sql = search_sql("iv", offset=100)
+    assert "LIKE" in sql
+    assert 'ORDER BY lower(clients.full_name) COLLATE "C", clients.id' in sql
+    assert "%>" not in sql